@@ -0,0 +1,123 @@
+"""
+MIT License
+
+Copyright (c) 2021 - µYert
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Per-entry memory footprint of TimedCache, with the old dataclass records
+# and with the slotted ones, plain and packed embeds,
+# run with `python -m benchmarks.cache_memory`
+
+import asyncio
+import gc
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+from utils import containers
+from utils.containers import TimedCache
+from utils.formatters import BetterEmbed
+
+SIZES = (10_000, 100_000)
+
+
+@dataclass
+class DataclassTimedValue:
+    """The previous entry record, a regular instance with a __dict__"""
+
+    value: Any
+    expires: datetime
+    deadline: float
+    size: int = 0
+    stale: float = float("inf")
+    refresh: Optional[Callable[[], Awaitable[Any]]] = None
+    error: Optional[Exception] = None
+
+
+class LegacyTimedCache(TimedCache):
+    """Builds the old records, expiry datetime included"""
+
+    def __setitem__(self, key, value, **kwargs):
+        super().__setitem__(key, value, **kwargs)
+        if (new := self.storage.get(key)) is not None:
+            self.storage[key] = DataclassTimedValue(
+                value=new.value,
+                expires=datetime.now(tz=timezone.utc) + timedelta(seconds=600),
+                deadline=new.deadline,
+                size=new.size,
+                stale=new.stale,
+                refresh=new.refresh,
+                error=new.error,
+            )
+
+
+def make_embed(i: int) -> BetterEmbed:
+    """Something shaped like the weather embed"""
+    embed = BetterEmbed(title=f"City number {i}", description="Clear sky " * 4)
+    for name in ("Temperature", "Feels like", "Humidity", "Wind", "Sunrise"):
+        embed.add_field(name=name, value=f"{i % 40} unit{'s' * (i % 2)}")
+    embed.set_footer(text=f"Requested by user {i}")
+    embed.set_thumbnail(url=f"https://openweathermap.org/img/wn/{i % 50:02}d.png")
+    return embed
+
+
+def measure(cls, size: int, **options) -> float:
+    """Returns the bytes allocated per entry once the cache is filled"""
+
+    async def fill():
+        cache = cls(timeout=600, loop=asyncio.get_running_loop(), **options)
+
+        gc.collect()
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+
+        # the embeds are counted too, packed caches let go of them
+        for i in range(size):
+            cache[("weather", i)] = make_embed(i)
+        gc.collect()
+
+        after, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return (after - before) / size
+
+    return asyncio.run(fill())
+
+
+def main() -> None:
+    variants = (
+        ("dataclass records", LegacyTimedCache, {}),
+        ("slotted records", TimedCache, {}),
+        ("packed embeds", TimedCache, {"pack_embeds": True}),
+        ("compressed embeds", TimedCache, {"compress_embeds": True}),
+    )
+    for size in SIZES:
+        print(f"{size:,} entries")
+        for label, cls, options in variants:
+            per_entry = measure(cls, size, **options)
+            print(f"  {label:<18} {per_entry:>8,.0f} B/entry")
+
+    embed = make_embed(1)
+    assert containers.PackedEmbed(embed).unpack().to_dict() == embed.to_dict()
+
+
+if __name__ == "__main__":
+    main()
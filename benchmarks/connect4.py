@@ -0,0 +1,126 @@
+"""
+MIT License
+
+Copyright (c) 2021 - µYert
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Random connect 4 games played on the bitboard against the list grid
+# and eval built lines ConnectMenu used to scan after every move,
+# run with `python -m benchmarks.connect4`
+
+import contextlib
+import random
+from time import perf_counter
+from typing import List, Tuple
+
+from packages.connect4_board import Board
+
+GAMES = 500  # the list grid needs about a minute for these
+SIZES = ((6, 7, 4), (15, 10, 4), (15, 10, 10))  # rows, columns, aligned
+
+
+def make_games(rows: int, columns: int, seed: int = 0) -> List[List[int]]:
+    rng = random.Random(seed)
+    return [
+        [rng.randrange(columns) for _ in range(rows * columns * 2)]
+        for _ in range(GAMES)
+    ]
+
+
+def legacy_lines(grid, row_index, column_index, max_offset):
+    """ConnectMenu.get_lines as it was"""
+    operators = ("-", "+")
+    yield grid[row_index]
+    yield [row[column_index] for row in grid]
+    for left_operator, right_operator in (operators, reversed(operators)):
+        nums = []
+        for offset in range(max_offset * 2):
+            y_offset = row_index - max_offset + offset
+            x_offset = eval(
+                f"column_index {left_operator} max_offset {right_operator} offset",
+                locals(),
+            )
+            if min(y_offset, x_offset) < 0:
+                continue
+            with contextlib.suppress(IndexError):
+                nums.append(grid[y_offset][x_offset])
+        yield nums
+
+
+def legacy_winner(lines, aligned: int) -> bool:
+    """ConnectMenu.check_winner as it was"""
+    for line in lines:
+        for offset, _ in enumerate(line):
+            if abs(sum(line[offset : offset + aligned])) >= aligned:
+                return True
+    return False
+
+
+def play_legacy(moves: List[int], rows: int, columns: int, aligned: int) -> int:
+    grid = [[0] * columns for _ in range(rows)]
+    max_offset = max(rows, columns)
+    token, played = 1, 0
+    for column in moves:
+        row = next((r for r in range(rows - 1, -1, -1) if not grid[r][column]), None)
+        if row is None:
+            continue
+        grid[row][column] = token
+        played += 1
+        if legacy_winner(legacy_lines(grid, row, column, max_offset), aligned):
+            break
+        if played == rows * columns:
+            break
+        token = -token
+    return played
+
+
+def play_board(moves: List[int], rows: int, columns: int, aligned: int) -> int:
+    board = Board(rows, columns, aligned)
+    for column in moves:
+        board.play(column)
+        if board.winner is not None or board.is_full():
+            break
+    return board.moves
+
+
+def measure(play, games, size: Tuple[int, int, int]) -> Tuple[float, int]:
+    start = perf_counter()
+    moves = sum(play(game, *size) for game in games)
+    return perf_counter() - start, moves
+
+
+def main() -> None:
+    for size in SIZES:
+        rows, columns, aligned = size
+        games = make_games(rows, columns)
+        print(f"{rows}x{columns}, {aligned} aligned ({GAMES:,} games)")
+
+        for name, play in (("list grid", play_legacy), ("bitboard", play_board)):
+            # every move is followed by a win check, so both rates are the same
+            elapsed, moves = measure(play, games, size)
+            print(
+                f"  {name:<10} {elapsed:7.3f}s  {moves / elapsed:>12,.0f} moves/s"
+                f"  {moves:,} moves"
+            )
+
+
+if __name__ == "__main__":
+    main()
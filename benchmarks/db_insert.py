@@ -0,0 +1,91 @@
+"""
+MIT License
+
+Copyright (c) 2021 - µYert
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# 10k rows through a looped Table.insert against Table.insert_many,
+# needs a PostgreSQL database to write into, run with
+# `python -m benchmarks.db_insert [dsn]`, config.PSQL_DETAILS by default
+
+import asyncio
+import sys
+from itertools import cycle
+from time import perf_counter
+
+from utils import db
+
+ROWS = 10_000
+
+
+class BenchInsert(db.Table, table_name="bench_insert_many"):
+    id = db.PrimaryKeyColumn()
+    guild_id = db.Column(db.Integer(big=True), nullable=False)
+    user_id = db.Column(db.Integer(big=True), nullable=False)
+    house = db.Column(db.String)
+
+
+def make_rows():
+    houses = ("bravery", "brilliance", "balance")
+    return [
+        {"guild_id": 336642139381301249, "user_id": 10 ** 17 + i, "house": house}
+        for i, house in zip(range(ROWS), cycle(houses))
+    ]
+
+
+async def _timed(label: str, coro) -> None:
+    start = perf_counter()
+    await coro
+    elapsed = perf_counter() - start
+    print(f"  {label:<12} {elapsed:8.3f}s  {ROWS / elapsed:>10,.0f} rows/s")
+
+
+async def _looped(rows, con) -> None:
+    for row in rows:
+        await BenchInsert.insert(connection=con, **row)
+
+
+async def main(dsn: str) -> None:
+    pool = await db.Table.create_pool(dsn)
+    rows = make_rows()
+    print(f"{ROWS:,} rows")
+
+    async with pool.acquire() as con:
+        await con.execute(BenchInsert.create_table(exists_ok=True))
+        try:
+            await _timed("insert loop", _looped(rows, con))
+            await con.execute("TRUNCATE bench_insert_many")
+            await _timed("insert_many", BenchInsert.insert_many(rows, connection=con))
+            assert await con.fetchval("SELECT count(*) FROM bench_insert_many") == ROWS
+        finally:
+            await con.execute("DROP TABLE bench_insert_many")
+
+    await pool.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        dsn = sys.argv[1]
+    else:
+        import config
+
+        dsn = config.PSQL_DETAILS
+    asyncio.run(main(dsn))
@@ -0,0 +1,106 @@
+"""
+MIT License
+
+Copyright (c) 2021 - µYert
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Prefix lookup over a stream of messages, the per-prefix startswith
+# discord.py does against the compiled PrefixMatcher,
+# run with `python -m benchmarks.prefix_matcher`
+
+import random
+from time import perf_counter
+from typing import Optional, Tuple
+
+from discord.ext.commands.view import StringView
+from discord.utils import find
+
+from utils.guild_config import PrefixMatcher
+
+MESSAGES = 1_000_000
+PREFIX_RATIO = 0.1  # most messages aren't commands
+
+PREFIX_SETS = {
+    "default": ("yoink ",),
+    "three": ("!", "?", "yoink "),
+    "seven, max length": (
+        "!",
+        "!!",
+        "yert ",
+        "yoink ",
+        "hey bot, ",
+        "pls do this ",
+        "a very long ",
+    ),
+}
+
+WORDS = "hello what lol is the bot up anyone playing tonight yoink ! ?".split()
+
+
+def make_stream(prefixes: Tuple[str, ...], seed: int = 0):
+    rng = random.Random(seed)
+    stream = []
+    for _ in range(MESSAGES):
+        content = " ".join(rng.choices(WORDS, k=rng.randint(1, 12)))
+        if rng.random() < PREFIX_RATIO:
+            content = rng.choice(prefixes) + content
+        stream.append(content)
+    return stream
+
+
+def discord_py(prefixes: list, content: str) -> Optional[str]:
+    """What Bot.get_context does with the list get_prefix used to return"""
+    view = StringView(content)
+    if content.startswith(tuple(prefixes)):
+        return find(view.skip_string, prefixes)
+    return None
+
+
+def with_matcher(matcher: PrefixMatcher, content: str) -> Optional[str]:
+    """The same with the single prefix, or nothing, get_prefix now returns"""
+    view = StringView(content)
+    prefix = matcher.match(content) or ()
+    if isinstance(prefix, str):
+        return prefix if view.skip_string(prefix) else None
+    return None
+
+
+def main() -> None:
+    for label, prefixes in PREFIX_SETS.items():
+        stream = make_stream(prefixes)
+        matcher = PrefixMatcher(prefixes)
+        print(f"{label} ({len(prefixes)} prefixes)")
+
+        for name, find in (
+            ("discord.py", lambda c: discord_py(list(prefixes), c)),
+            ("matcher", lambda c: with_matcher(matcher, c)),
+        ):
+            start = perf_counter()
+            matched = sum(find(content) is not None for content in stream)
+            elapsed = perf_counter() - start
+            print(
+                f"  {name:<10} {elapsed:7.3f}s  {MESSAGES / elapsed:>12,.0f} msg/s"
+                f"  {matched:,} matched"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+MIT License
+
+Copyright (c) 2021 - µYert
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Building 100k table rows out of records: the records as is, the
+# generated slotted rows, and the column oriented RowArray.
+# run with `python -m benchmarks.table_rows [dsn]`, with a DSN the
+# records are real asyncpg ones, otherwise dicts stand in for them
+
+import asyncio
+import gc
+import sys
+import tracemalloc
+from time import perf_counter
+
+from utils import db
+
+ROWS = 100_000
+
+
+class BenchRow(db.Table, table_name="game_data"):
+    user_id = db.Column(db.Integer(big=True), primary_key=True)
+    wins = db.Column(db.Integer)
+    losses = db.Column(db.Integer)
+    amount = db.Column(db.Integer)
+
+
+def fake_records():
+    return [
+        {"user_id": 10 ** 17 + i, "wins": i % 50, "losses": i % 70, "amount": 150 + i}
+        for i in range(ROWS)
+    ]
+
+
+async def real_records(dsn):
+    con = await db.asyncpg.connect(dsn)
+    try:
+        return await con.fetch(
+            "SELECT 100000000000000000 + g AS user_id, g % 50 AS wins,"
+            " g % 70 AS losses, 150 + g AS amount"
+            " FROM generate_series(0, $1 - 1) g",
+            ROWS,
+        )
+    finally:
+        await con.close()
+
+
+def measure(label, build, make_records) -> None:
+    records = make_records()
+    start = perf_counter()
+    build(records)
+    elapsed = perf_counter() - start
+    del records
+
+    # what's left once the records themselves are gone
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    result = build(make_records())
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # reading one column back, the usual thing done with many rows
+    start = perf_counter()
+    if isinstance(result, db.RowArray):
+        total = sum(result.column("amount"))
+    elif isinstance(result[0], db.Row):
+        total = sum(row.amount for row in result)
+    else:
+        total = sum(row["amount"] for row in result)
+    read = perf_counter() - start
+    assert total == sum(150 + i for i in range(ROWS))
+
+    print(
+        f"  {label:<14} build {elapsed * 1000:7.1f}ms  "
+        f"{(after - before) / ROWS:6.0f} B/row  read {read * 1000:6.1f}ms"
+    )
+
+
+def main(dsn=None) -> None:
+    if dsn is not None:
+        make_records = lambda: asyncio.run(real_records(dsn))
+        print(f"{ROWS:,} asyncpg records")
+    else:
+        make_records = fake_records
+        print(f"{ROWS:,} dict records")
+
+    from_record = BenchRow.Row.from_record
+    measure("records", lambda records: records, make_records)
+    measure("slotted rows", lambda rs: [from_record(r) for r in rs], make_records)
+    measure("RowArray", BenchRow.Row.bulk, make_records)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
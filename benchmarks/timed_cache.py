@@ -0,0 +1,92 @@
+"""
+MIT License
+
+Copyright (c) 2021 - µYert
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Insert / overwrite / expiry throughput of TimedCache against the old
+# task-per-key implementation, run with `python -m benchmarks.timed_cache`
+
+import asyncio
+from asyncio import sleep as async_sleep
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any
+
+from utils.containers import TimedCache
+
+KEYS = 100_000
+
+
+@dataclass
+class _TaskValue:
+    value: Any
+    task: asyncio.Task
+
+
+class TaskTimedCache(dict):
+    """The previous implementation, one sleeping task per key"""
+
+    def __init__(self, *, timeout: int = 600, loop=None):
+        super().__init__()
+        self.timeout = timeout
+        self.loop = loop
+
+    async def _timed_del(self, key, timeout):
+        self.pop(await async_sleep(timeout or self.timeout, result=key))
+
+    def set(self, key, value, timeout=None):
+        if old_val := self.pop(key, None):
+            old_val.task.cancel()
+        coro = self._timed_del(key, timeout=timeout)
+        task = self.loop.create_task(coro, name="Timed deletion")
+        super().__setitem__(key, _TaskValue(value=value, task=task))
+
+
+def _timed(label: str, func) -> None:
+    start = perf_counter()
+    func()
+    elapsed = perf_counter() - start
+    print(f"  {label:<10} {elapsed:8.3f}s  {KEYS / elapsed:>12,.0f} ops/s")
+
+
+async def _run(cls) -> None:
+    loop = asyncio.get_running_loop()
+    cache = cls(timeout=0.5, loop=loop)
+    print(cls.__name__)
+
+    _timed("insert", lambda: [cache.set(i, i) for i in range(KEYS)])
+    _timed("overwrite", lambda: [cache.set(i, i) for i in range(KEYS)])
+
+    start = perf_counter()
+    while len(cache):
+        await asyncio.sleep(0.01)
+    elapsed = perf_counter() - start - 0.5
+    print(f"  {'expiry':<10} {elapsed:8.3f}s past the deadline")
+
+
+def main() -> None:
+    for cls in (TaskTimedCache, TimedCache):
+        asyncio.run(_run(cls))
+
+
+if __name__ == "__main__":
+    main()
@@ -29,7 +29,7 @@ from typing import Union
 import discord
 from config import SAUCENAO_TOKEN
 from discord.ext import commands, menus
-from main import NewCtx
+from main import NewCtx, cached, nsfw_key
 from packages import aiojikan, aiosaucenao
 
 
@@ -55,13 +55,13 @@ class Anime(commands.Cog):
 
         ctx.cache_key += [image]
 
-        if not (source := ctx.cached_data):
-
+        async def fetch_source():
             response = await self.aiosaucenao.search(image)
-            source = ctx.add_to_cache(
-                value=aiosaucenao.Source(response.results),
-                timeout=datetime.timedelta(hours=24),
-            )
+            return aiosaucenao.Source(response.results)
+
+        source = await ctx.fetch_cached(
+            fetch_source, timeout=datetime.timedelta(hours=24)
+        )
 
         menu = menus.MenuPages(source, delete_message_after=True)
 
@@ -97,22 +97,11 @@ class Anime(commands.Cog):
 
         @commands.command()
         @commands.cooldown(1, 15, commands.BucketType.user)
+        @cached(timeout=datetime.timedelta(hours=24), key=nsfw_key)
         async def template(ctx: NewCtx, *, query: str):
-            is_nsfw = ctx.channel.is_nsfw()
-            ctx.cache_key += [is_nsfw]
-
-            if not (response := ctx.cached_data):
-
-                await self._check_api_cooldowns(ctx)
-
-                response = await self.aiojikan.search(ctx.command.name, query)
-                ctx.add_to_cache(response, timeout=datetime.timedelta(hours=24))
-
-            source = aiojikan.Source(response.results, is_nsfw=is_nsfw)
-
-            menu = menus.MenuPages(source, delete_message_after=True)
-
-            await menu.start(ctx)
+            await self._check_api_cooldowns(ctx)
+            response = await self.aiojikan.search(ctx.command.name, query)
+            return aiojikan.Source(response.results, is_nsfw=ctx.channel.is_nsfw())
 
         for name in ("anime", "manga", "person", "character"):
             mal_command = template.copy()
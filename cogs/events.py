@@ -83,8 +83,9 @@ class Events(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def _toggle_tracker(self, ctx: NewCtx):
         """Toggles watching events like `on_member_join/remove` for server info"""
-        query = "UPDATE guild_config SET stats_enabled = True WHERE guild_id = $1;"
-        await self.bot.pool.execute(query, ctx.guild.id)
+        await self.bot.guild_config.set_stats_enabled(ctx.guild.id, True)
+        if stats := self.bot.get_cog("Stats"):
+            stats.forget(ctx.guild.id)
 
     @commands.group(invoke_without_command=True, name="ignored", hidden=True)
     @commands.is_owner()
@@ -177,14 +178,6 @@ class Events(commands.Cog):
 
         await ctx.webhook_send(short, full, exc_info, webhook=self.webhook)
 
-    @commands.Cog.listener()
-    async def on_member_join(self, member: discord.Member):
-        await self.bot.pool.execute("CALL evaluate_data($1, true);", member.guild.id)
-
-    @commands.Cog.listener()
-    async def on_member_remove(self, member: discord.Member):
-        await self.bot.pool.execute("CALL evaluate_data($1, false);", member.guild.id)
-
     @commands.Cog.listener()
     async def on_guild_join(self, guild):
         embed = discord.Embed(title="New Guild", colour=discord.Colour.green())
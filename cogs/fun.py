@@ -42,6 +42,7 @@ class Fun(commands.Cog):
             return
 
         ctx.cache_key = ("cleverbot", ctx.author.id)
+        ctx.cache_region = "fun"  # no command was invoked, so there's no cog either
         emotion = self.aiocleverbot.update_emotion(ctx)
 
         await ctx.trigger_typing()
@@ -23,15 +23,17 @@ SOFTWARE.
 """
 import asyncio
 import random
+from collections import Counter, deque
 from datetime import datetime
 from itertools import zip_longest
 from typing import Optional, Union
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from fuzzywuzzy import process
-from main import Bot, NewCtx
+from main import Bot, NewCtx, flush_logged
 from packages import blackjack, connect4, roulette
+from packages.ledger import STARTING_AMOUNT, GameData, Ledger
 from utils import db
 from utils.formatters import BetterEmbed
 
@@ -260,6 +262,28 @@ class GuessWordGame:
         await self.send_message()
 
 
+HOUSES = ("balance", "bravery", "brilliance")
+
+# adds the pending reactions of every guild onto its counts at once
+FLUSH_HOUSES = """
+INSERT INTO hypesquad_house (guild_id, balance_count, bravery_count, brilliance_count)
+SELECT * FROM unnest($1::bigint[], $2::int[], $3::int[], $4::int[])
+ON CONFLICT (guild_id) DO UPDATE
+SET balance_count = COALESCE(hypesquad_house.balance_count, 0) + excluded.balance_count,
+    bravery_count = COALESCE(hypesquad_house.bravery_count, 0) + excluded.bravery_count,
+    brilliance_count = COALESCE(hypesquad_house.brilliance_count, 0)
+        + excluded.brilliance_count;
+"""
+
+
+def hypesquad_house(member: discord.Member) -> Optional[str]:
+    flags = member.public_flags
+    for house in HOUSES:
+        if getattr(flags, f"hypesquad_{house}"):
+            return house
+    return None
+
+
 class HypeSquadHouse(db.Table, table_name="hypesquad_house"):
     """
     # ! This is probably just a documentation thing right now for db table.
@@ -268,7 +292,7 @@ class HypeSquadHouse(db.Table, table_name="hypesquad_house"):
     Documents the table layout, should be easy to read.
     """
 
-    guild_id = db.Column(db.Integer(big=True))
+    guild_id = db.Column(db.Integer(big=True), primary_key=True)
     balance_count = db.Column(db.Integer)
     bravery_count = db.Column(db.Integer)
     brilliance_count = db.Column(db.Integer)
@@ -280,8 +304,9 @@ class HypeSquadHouseReacted(db.Table, table_name="hypesquad_house_reacted"):
     from since this game is guild agnostic.
     """
 
-    guild_id = db.Column(db.Integer(big=True))
-    user_id = db.Column(db.Integer(big=True))
+    guild_id = db.Column(db.Integer(big=True), primary_key=True)
+    user_id = db.Column(db.Integer(big=True), primary_key=True)
+    reacted_date = db.Column(db.Datetime)
 
 
 class Games(commands.Cog):
@@ -290,6 +315,14 @@ class Games(commands.Cog):
     def __init__(self, bot: Bot):
         self.bot = bot
         self.timeout = 30
+        self.ledger = Ledger()
+        # the recent messages we sent, reactions to anything else are ignored
+        self.own_messages = set()
+        self._own_messages_order = deque()
+        self.own_messages_limit = 2_000
+        self.counted = set()  # (guild_id, user_id) already in hypesquad_house_reacted
+        self.house_deltas = Counter()  # (guild_id, house) -> pending change
+        self.flush_pending.start()
         self.lists = List_holder()
         self.roulette_options = [
             "firstcol",
@@ -306,13 +339,6 @@ class Games(commands.Cog):
             "high",
         ]
 
-        self.queries = {
-            "get_user_data": "SELECT * FROM game_data WHERE user_id=$1;",
-            "new_user": "INSERT INTO game_data VALUES($1, $2, $3, $4);",
-            "win": "UPDATE game_data SET wins=$1, amount=$2 WHERE user_id=$3;",
-            "loss": "UPDATE game_data SET losses=$1, amount=$2 WHERE user_id=$3;",
-        }
-
         self.roulette_games = dict()
 
     async def changer(self, message: discord.Message, picked_list: list) -> None:
@@ -324,11 +350,6 @@ class Games(commands.Cog):
         await asyncio.sleep(0.5)
         await message.edit(content=f"Your god is `{random.choice(picked_list)}`")
 
-    async def db_query(self, bot: Bot, query: str, *args: tuple):
-        query = self.queries[query]
-        result = await bot.pool.fetchrow(query, *args)
-        return result
-
     @commands.command(hidden=True)
     async def pick(self, ctx: NewCtx, target_list: Optional[str]):
         """Selects a random god from smite to play as, can take a specific class (assassin, mage, etc) or leave blank for any class"""
@@ -368,9 +389,8 @@ class Games(commands.Cog):
                 "You must bet between 1 and 100 <:peepee:712691831703601223>."
             )
         else:
-            result = await self.db_query(self.bot, "get_user_data", ctx.author.id)
-            if result:
-                available_currency = result["amount"]
+            available_currency = await self.ledger.balance(ctx.author.id)
+            if available_currency is not None:
                 if bet > available_currency:
                     return await ctx.send(
                         "You don't have enough <:peepee:712691831703601223> for that bet."
@@ -379,21 +399,13 @@ class Games(commands.Cog):
                     await ctx.send(
                         f"Very well, your {bet}<:peepee:712691831703601223> will be gladly accepted."
                     )
-                    wins = result["wins"]
-                    losses = result["losses"]
 
             else:
-                query = self.queries["new_user"]
-                await self.bot.pool.execute(query, ctx.author.id, 0, 0, 150)
-                wins = 0
-                losses = 0
-                available_currency = 150
+                await self.ledger.open_account(ctx.author.id)
                 await ctx.send(
-                    "Yoink has not seen you before, have 150 <:peepee:712691831703601223> on the house."
+                    f"Yoink has not seen you before, have {STARTING_AMOUNT} <:peepee:712691831703601223> on the house."
                 )
 
-            house = await self.db_query(self.bot, "get_user_data", self.bot.user.id)
-
             embed = BetterEmbed()
             embed.add_field(
                 name=f"{ctx.author.display_name} vs the house",
@@ -415,37 +427,62 @@ class Games(commands.Cog):
                     "The game was drawn, your <:peepee:712691831703601223> have been returned."
                 )
 
-            elif winner.id == ctx.author.id:
-                await ctx.send(
-                    f"Congratulations, you beat the house, take your {bet}<:peepee:712691831703601223> "
-                )
-                end_amount = available_currency + bet
-                query = self.queries["win"]
-                await self.bot.pool.execute(query, wins + 1, end_amount, ctx.author.id)
-                other_query = self.queries["loss"]
-                await self.bot.pool.execute(
-                    other_query,
-                    house["losses"] + 1,
-                    house["amount"] - bet,
-                    self.bot.user.id,
-                )
-
             else:
-                await ctx.send(
-                    f"The house always wins, your {bet}<:peepee:712691831703601223> have been yoinked."
-                )
-                end_amount = available_currency - bet
-                query = self.queries["loss"]
-                await self.bot.pool.execute(
-                    query, losses + 1, end_amount, ctx.author.id
-                )
-                other_query = self.queries["win"]
-                await self.bot.pool.execute(
-                    other_query,
-                    house["wins"] + 1,
-                    house["amount"] + bet,
-                    self.bot.user.id,
+                won = winner.id == ctx.author.id
+                end_amount = self.ledger.record(
+                    ctx.author.id, bet if won else -bet, "blackjack", won=won
                 )
+                if end_amount is None:
+                    await ctx.send(
+                        "You no longer have enough <:peepee:712691831703601223> "
+                        "to cover that bet, it has been called off."
+                    )
+                elif won:
+                    await ctx.send(
+                        f"Congratulations, you beat the house, take your {bet}<:peepee:712691831703601223>, "
+                        f"you now have {end_amount}."
+                    )
+                else:
+                    await ctx.send(
+                        f"The house always wins, your {bet}<:peepee:712691831703601223> have been yoinked, "
+                        f"you have {end_amount} left."
+                    )
+
+    async def flush(self):
+        """Writes the ledger and the hypesquad reactions counted in memory"""
+        await self.ledger.flush()
+        await self.flush_houses()
+
+    async def flush_houses(self):
+        if not self.house_deltas:
+            return
+
+        deltas, self.house_deltas = self.house_deltas, Counter()
+        guild_ids = list({guild_id for guild_id, _ in deltas})
+        try:
+            await self.bot.pool.execute(
+                FLUSH_HOUSES,
+                guild_ids,
+                *(
+                    [deltas[guild_id, house] for guild_id in guild_ids]
+                    for house in HOUSES
+                ),
+            )
+        except Exception:
+            self.house_deltas.update(deltas)
+            raise
+
+    @tasks.loop(seconds=30)
+    async def flush_pending(self):
+        await flush_logged(self.flush, "the games")
+
+    @flush_pending.after_loop
+    async def after_flush_pending(self):
+        # the last moves when the cog goes away
+        await flush_logged(self.flush, "the games")
+
+    def cog_unload(self):
+        self.flush_pending.cancel()
 
     @commands.command(name="start", hidden=True)
     @commands.cooldown(1, 80, commands.BucketType.channel)
@@ -518,27 +555,35 @@ class Games(commands.Cog):
         user_id = getattr(target, "id", None) or ctx.author.id
         target = target or ctx.author
 
-        query = "SELECT * FROM game_data WHERE user_id=$1;"
-        result = await self.bot.pool.fetchrow(query, user_id)
-        if result:
+        if user_id == self.bot.user.id:
+            # the house's numbers are its old row plus a sum over the ledger
+            amount, wins, losses = await self.ledger.house(user_id)
+            e = BetterEmbed(title=target.display_name)
+            e.add_field(
+                name=f"The house holds {amount} <:peepee:712691831703601223>.",
+                value="\u200b",
+            )
+            e.description = f"Wins : {wins}\nLosses : {losses}"
+            e.set_author(name=target.display_name, icon_url=str(target.avatar_url))
+            return await ctx.send(embed=e)
+
+        # served from memory, the games' writes might not be flushed yet
+        account = await self.ledger.account(user_id)
+        if account is not None:
             e = BetterEmbed(title=target.display_name)
             e.add_field(
-                name=f"Your currently have {result['amount']} <:peepee:712691831703601223>.",
+                name=f"Your currently have {account.amount} <:peepee:712691831703601223>.",
                 value="\u200b",
             )
-            e.description = f"Wins : {result['wins']}\nLosses : {result['losses']}"
+            e.description = f"Wins : {account.wins}\nLosses : {account.losses}"
             e.set_author(name=target.display_name, icon_url=str(target.avatar_url))
             return await ctx.send(embed=e)
         else:
             await ctx.send("Yoink hasn't seen you before, wait one.")
-            query = (
-                "INSERT INTO game_data (user_id, wins, losses, amount)"
-                "VALUES ($1, $2, $3, $4);"
-            )
-            await self.bot.pool.execute(query, user_id, 0, 0, 150)
+            account = await self.ledger.open_account(user_id)
             e = BetterEmbed(title=target.display_name)
             e.add_field(
-                name="Your currently have 150 <:peepee:712691831703601223>.",
+                name=f"Your currently have {account.amount} <:peepee:712691831703601223>.",
                 value="\u200b",
             )
             e.description = "Wins : 0\nLosses : 0"
@@ -551,8 +596,8 @@ class Games(commands.Cog):
 
         user_id = getattr(target, "id", None) or ctx.author.id
         name = getattr(target, "display_name", None) or ctx.author.display_name
-        query = "DELETE FROM game_data WHERE user_id=$1;"
-        await self.bot.pool.execute(query, user_id)
+        await GameData.delete(user_id=user_id)
+        self.ledger.forget(user_id)
         await ctx.send(f"Entry of {name} cleared.")
 
     @commands.Cog.listener()
@@ -560,11 +605,24 @@ class Games(commands.Cog):
         """
         Adding the guild to the table in the event they want to play.
         """
-        house_query = """INSERT INTO hypesquad_house
-                         (guild_id, balance_count, bravery_count, brilliance_count)
-                         VALUES ($1, 0, 0, 0);
-                      """
-        await self.bot.pool.execute(house_query, guild.id)
+        await HypeSquadHouse.upsert(
+            overwrite=False,
+            guild_id=guild.id,
+            balance_count=0,
+            bravery_count=0,
+            brilliance_count=0,
+        )
+
+    def _remember(self, message_id: int):
+        self.own_messages.add(message_id)
+        self._own_messages_order.append(message_id)
+        if len(self._own_messages_order) > self.own_messages_limit:
+            self.own_messages.discard(self._own_messages_order.popleft())
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.guild and message.author.id == self.bot.user.id:
+            self._remember(message.id)
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
@@ -573,54 +631,30 @@ class Games(commands.Cog):
         On a reaction we'll add the user's house to the count if they have
         not already reacted.
         """
+        if payload.message_id not in self.own_messages:
+            return  # ! Only the bots messages work, DMs never get in there
+        key = (payload.guild_id, payload.user_id)
+        if key in self.counted:
+            return  # ! They already reacted
 
-        channel = self.bot.get_channel(payload.channel_id)
-        if not channel.guild:
-            return  # ! We don't want DM cheats
-        try:
-            message = await channel.fetch_message(payload.message_id)
-        except discord.errors.NotFound:
-            return
-        if message.author != self.bot.user:
-            return  # ! Only the bots messages work
-        reacting_member = message.guild.get_member(payload.user_id)
-        if reacting_member.bot:
-            return  # ! No bots
-
+        reacting_member = payload.member
         if not reacting_member:
             return  # ! Not in the guild?? Edge case
-        # Time to check if they're already in here
-        duped_query = """SELECT *
-                         FROM hypesquad_house_reacted
-                         WHERE guild_id = $1
-                         AND user_id = $2;
-                      """
-        duped = await self.bot.pool.fetchrow(
-            duped_query, reacting_member.guild.id, reacting_member.id
-        )
-        if duped:
-            return  # ! They already reacted
-
-        member_flags = reacting_member.public_flags
-        if member_flags.value == 0:
-            return
-        if member_flags.hypesquad_balance:
-            flag = "balance"
-        elif member_flags.hypesquad_bravery:
-            flag = "bravery"
-        elif member_flags.hypesquad_brilliance:
-            flag = "brilliance"
-        else:
+        if reacting_member.bot:
+            return  # ! No bots
+        if not (house := hypesquad_house(reacting_member)):
             return
-        flag_query = f"""UPDATE hypesquad_house
-                         SET {flag}_count = {flag}_count + 1
-                         WHERE guild_id = $1
-                      """
-        query = """INSERT INTO hypesquad_house_reacted (guild_id, user_id, reacted_date) VALUES ($1, $2, $3);"""
-        await self.bot.pool.execute(
-            query, reacting_member.guild.id, reacting_member.id, datetime.utcnow()
+
+        # nothing comes back when they were already in there
+        inserted = await HypeSquadHouseReacted.upsert(
+            overwrite=False,
+            guild_id=payload.guild_id,
+            user_id=payload.user_id,
+            reacted_date=datetime.utcnow(),
         )
-        return await self.bot.pool.execute(flag_query, reacting_member.guild.id)
+        self.counted.add(key)
+        if inserted:
+            self.house_deltas[payload.guild_id, house] += 1
 
     @commands.Cog.listener()
     async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
@@ -628,35 +662,20 @@ class Games(commands.Cog):
         Little more confusing, we need to check if the removing user has reacted before,
         and if so, decrement the value for their house.
         """
-        query = """DELETE FROM hypesquad_house_reacted
-                   WHERE guild_id = $1
-                   AND user_id = $2
-                   RETURNING user_id;
-                """
-        possible_user = await self.bot.pool.fetchrow(
-            query, payload.guild_id, payload.user_id
+        if payload.message_id not in self.own_messages:
+            return
+        possible_user = await HypeSquadHouseReacted.delete(
+            guild_id=payload.guild_id, user_id=payload.user_id
         )
+        self.counted.discard((payload.guild_id, payload.user_id))
         if not possible_user:
             return
 
         # ! Time to decrement their house value...
-        guild = self.bor.get_guild(payload.guild_id)
+        guild = self.bot.get_guild(payload.guild_id)
         member = guild.get_member(payload.user_id)
-        flags = member.public_flags
-        if flags.hypesquad_balance:
-            house = "balance"
-        elif flags.hypesquad_bravery:
-            house = "bravery"
-        elif flags.hypesquad_brilliance:
-            house = "brilliance"
-        else:
-            return
-
-        house_query = f"""UPDATE hypesquad_house
-                          SET {house}_count = {house}_count - 1
-                          WHERE guild_id = $1;
-                       """
-        return await self.bot.pool.execute(house_query, payload.guild_id)
+        if member and (house := hypesquad_house(member)):
+            self.house_deltas[payload.guild_id, house] -= 1
 
     @commands.command(name="set_timeout")
     @commands.is_owner()
@@ -32,7 +32,7 @@ from typing import Any, List
 import discord
 from discord import Embed  # needs fix :tm:
 from discord.ext import commands, menus
-from main import NewCtx
+from main import NewCtx, cached, nsfw_key, send_cached
 
 from reddit import Reddit
 
@@ -50,6 +50,16 @@ class PagedEmbedMenu(menus.ListPageSource):
         return self.embeds[page]
 
 
+async def send_requested(ctx: NewCtx, value: Any):
+    """Sends the cached posts, with who asked for them this time in the footers"""
+    if isinstance(value, PagedEmbedMenu):
+        value = PagedEmbedMenu([
+            embed.copy().set_footer(text=f"{embed.footer.text} | Requested by {ctx.author}")
+            for embed in value.embeds
+        ])
+    await send_cached(ctx, value)
+
+
 class Memes(commands.Cog):
     """ Memes cog. Probably gonna be loaded with dumb commands. """
 
@@ -58,7 +68,7 @@ class Memes(commands.Cog):
         _reddit_session = aiohttp.ClientSession(headers={"User-Agent": "Yoink discord bot"})
         self._reddit = Reddit.from_sub('aww', cs=_reddit_session)
 
-    def _gen_embeds(self, requester: str, posts: List[Any]) -> List[Embed]:
+    def _gen_embeds(self, posts: List[Any]) -> List[Embed]:
         embeds = []
 
         for post in posts:
@@ -81,17 +91,18 @@ class Memes(commands.Cog):
             embed.add_field(name="Updoots", value=post.ups, inline=True)
             embed.add_field(name="Total comments", value=post.num_comments, inline=True)
             page = f"Result {posts.index(post) + 1} of {len(posts)}"
-            embed.set_footer(text=f"{page} | {post.subreddit} | Requested by {requester}")
+            embed.set_footer(text=f"{page} | {post.subreddit}")
 
             embeds.append(embed)
         return embeds
 
     @commands.command()
     @commands.max_concurrency(1, commands.BucketType.channel, wait=False)
+    @cached(timeout=300, key=nsfw_key, send=send_requested)
     async def reddit(self, ctx: NewCtx, sub: str = 'memes', sort: str = 'hot', timeframe: str = 'all', comments: bool = False):
         """Gets the <sub>reddit's posts sorted by <sort> method within the <timeframe> with <comments> determining wether to fetch comments too"""
         if not sort.lower() in ('hot', 'new', 'top', 'rising', 'controversial'):
-            return await ctx.send('Not a valid sort method')
+            return 'Not a valid sort method'
 
         if sub != self._reddit.sub:
             self._reddit = await Reddit.from_sub(
@@ -108,9 +119,8 @@ class Memes(commands.Cog):
         else:
             posts = self._reddit.posts
 
-        embeds = self._gen_embeds(ctx.author, posts)
-        pages = menus.MenuPages(PagedEmbedMenu(embeds))
-        await pages.start(ctx)
+        embeds = self._gen_embeds(posts)
+        return PagedEmbedMenu(embeds)
 
     @reddit.error
     async def reddit_error(self, ctx: NewCtx, error):
@@ -31,7 +31,8 @@ from time import perf_counter
 import config
 import discord
 from discord.ext import commands, menus
-from main import NewCtx
+from humanize import naturalsize
+from main import NewCtx, cached
 from utils.converters import CommandConverter
 from utils.formatters import BetterEmbed
 
@@ -191,6 +192,7 @@ class Meta(commands.Cog):
         return self.git_cache[:-1]
 
     @commands.command()
+    @cached(timeout=600, key=lambda ctx: (getattr(ctx.guild, "id", None),))
     async def about(self, ctx: NewCtx):
         """ This is the 'about the bot' command. """
         # Github id of the contributors and their corresponding discord id
@@ -233,7 +235,7 @@ class Meta(commands.Cog):
             value="https://github.com/uYert/yert",
             inline=False,
         )
-        await ctx.send(embed=embed)
+        return embed
 
     @commands.command()
     async def ping(self, ctx: NewCtx):
@@ -247,6 +249,52 @@ class Meta(commands.Cog):
             ),
         )
 
+    @commands.command(name="cache", hidden=True)
+    @commands.is_owner()
+    async def _cache(self, ctx: NewCtx):
+        """Shows the usage of every cache region"""
+        embed = BetterEmbed(title="Cache regions")
+
+        for name, region in self.bot.cache.items():
+            stats = region.stats
+            embed.add_field(
+                name=name,
+                value=f"Entries : {len(region)}\n"
+                f"Size : {naturalsize(region.total_bytes)}\n"
+                f"Hits : {stats.hits} | Misses : {stats.misses}\n"
+                f"Evictions : {stats.evictions} | Expired : {stats.expirations}\n"
+                f"Negative hits : {stats.negative_hits}",
+            )
+
+        await ctx.send(embed=embed)
+
+    @commands.command(name="queries", hidden=True)
+    @commands.is_owner()
+    async def _queries(self, ctx: NewCtx, amount: int = 5):
+        """Shows the statements costing the most, by total time and by p99"""
+        stats = self.bot.pool.stats
+        waits = stats.acquire_waits
+        embed = BetterEmbed(
+            title="Queries",
+            description=f"{len(stats.statements)} statements | "
+            f"{waits.count} acquires, p99 wait {waits.percentile(0.99) * 1000:.1f}ms\n"
+            f"{len(stats.recent_slow)} slow ones since the last reset",
+        )
+
+        for by in ("total", "p99"):
+            lines = [
+                f"`{hist.total * 1000:.0f}ms` total | `{hist.percentile(0.99) * 1000:.1f}ms`"
+                f" p99 | {hist.count} calls\n`{query[:60]}`"
+                for query, hist in stats.top(amount, by=by)
+            ]
+            embed.add_field(
+                name=f"Top by {by}",
+                value="\n".join(lines)[:1024] or "Nothing ran yet",
+                inline=False,
+            )
+
+        await ctx.send(embed=embed)
+
     @commands.command()
     async def suggest(self, ctx: NewCtx, *, suggestion: str):
         if len(suggestion) >= 1000:
@@ -31,7 +31,7 @@ from typing import Union
 
 import discord
 from discord.ext import commands
-from main import NewCtx
+from main import NewCtx, cached
 from PIL import Image
 from utils import formatters
 
@@ -132,14 +132,30 @@ class Other(commands.Cog):
         await ctx.send(embed=embed, file=fileout)
 
     @commands.command(name="pep")
+    @cached(timeout=datetime.timedelta(hours=12))
     async def _pep_finder(self, ctx: NewCtx, target: int = 8):
         """Gets the pep of your desires"""
         if not (0 <= target <= 8101):
-            return await ctx.send("PEPs only exist between 0 and 8101.")
+            return "PEPs only exist between 0 and 8101."
         url = f"https://www.python.org/dev/peps/pep-{target:04d}/"
-        if not (await self.bot.session.get(url)).status == 200:
-            return await ctx.send("PEP not found")
-        await ctx.send(f"Here you go, pep {target:04d} \n{url}")
+        async with self.bot.session.get(url) as resp:
+            status = resp.status
+        if status == 404:
+            # a BadArgument is only cached for the short negative timeout
+            raise commands.BadArgument("PEP not found")
+        if status != 200:
+            raise commands.CommandError(
+                f"python.org failed ({status}), try again later"
+            )
+        return f"Here you go, pep {target:04d} \n{url}"
+
+    @_pep_finder.error
+    async def _pep_finder_error(self, ctx: NewCtx, error):
+        """ Local Error handler for pep command. """
+        error = getattr(error, "original", error)
+        if isinstance(error, commands.CommandError):  # not found, or python.org down
+            return await ctx.send(str(error))
+        self.bot.dispatch('command_error', ctx, error)
 
     @commands.command(name="visualise", aliases=["vis", "colour", "color", "show"])
     async def _visual(self, ctx: NewCtx, value: Union[int, discord.Colour], *extra):
@@ -27,6 +27,7 @@ from typing import Optional, List, Tuple
 
 import config
 import main
+from async_cse.search import NoResults
 from discord.ext import commands, menus
 from packages import aiogooglesearch, aiomagmachain, aiotranslator, aioweather
 from utils import converters
@@ -74,17 +75,17 @@ class Practical(commands.Cog):
 
     @commands.command(name="weather")
     @commands.cooldown(1, 30, type=commands.BucketType.channel)
+    @main.cached(
+        timeout=datetime.timedelta(minutes=30),
+        stale_after=datetime.timedelta(minutes=10),
+    )
     async def weather(self, ctx: main.NewCtx, *, city: str):
         """Displays the weather at a particular location"""
-        if not (embed := ctx.cached_data):
-
-            res = await self.aioweather.fetch_weather(city)
-            embed = self.aioweather.format_weather(res)
-            ctx.add_to_cache(value=embed, timeout=datetime.timedelta(minutes=10))
-
-        await ctx.send(embed=embed)
+        res = await self.aioweather.fetch_weather(city)
+        return self.aioweather.format_weather(res)
 
     @commands.group(name="translate", invoke_without_command=True)
+    @main.cached(timeout=datetime.timedelta(minutes=60))
     async def translate(
         self,
         ctx: main.NewCtx,
@@ -93,72 +94,67 @@ class Practical(commands.Cog):
         text: str,
     ):
         """Translates from another language"""
-        if not (embed := ctx.cached_data):
-            # the embed is implicitely cached there, since it's used by both subcommnands
-            embed = await self.aiotranslator.do_translation(
-                ctx=ctx, text=text, translation_kwarg={"src": language}
-            )
-        await ctx.send(embed=embed)
+        return await self.aiotranslator.do_translation(
+            text=text, translation_kwarg={"src": language}
+        )
 
     @translate.command(name="to")
+    @main.cached(timeout=datetime.timedelta(minutes=60))
     async def translate_to(
         self, ctx: main.NewCtx, language: aiotranslator.to_language, *, text: str
     ):
         """Translate something to another language"""
-        if not (embed := ctx.cached_data):
-            embed = await self.aiotranslator.do_translation(
-                ctx=ctx, text=text, translation_kwarg={"dest": language}
-            )
-        await ctx.send(embed=embed)
+        return await self.aiotranslator.do_translation(
+            text=text, translation_kwarg={"dest": language}
+        )
 
     @commands.group(name="google", invoke_without_command=True)
     @commands.cooldown(1, 15, commands.BucketType.user)
+    @main.cached(
+        timeout=datetime.timedelta(minutes=15),
+        stale_after=datetime.timedelta(minutes=5),
+        key=main.nsfw_key,
+        negative=(commands.BadArgument, NoResults),
+    )
     async def google(self, ctx: main.NewCtx, *, query: str):
         """Searches something on google"""
-        is_nsfw = ctx.channel.is_nsfw()
-        ctx.cache_key += [is_nsfw]
-
-        if not (source := ctx.cached_data):
-
-            source = await self.aiogoogle.do_search(ctx, query=query, is_nsfw=is_nsfw)
-
-        menu = menus.MenuPages(source, delete_message_after=True)
-        await menu.start(ctx)
+        return await self.aiogoogle.do_search(
+            query=query, is_nsfw=ctx.channel.is_nsfw()
+        )
 
     @google.command(name="image", aliases=["-i"])
     @commands.cooldown(1, 15, commands.BucketType.user)
+    @main.cached(
+        timeout=datetime.timedelta(minutes=15),
+        stale_after=datetime.timedelta(minutes=5),
+        key=main.nsfw_key,
+        negative=(commands.BadArgument, NoResults),
+        send=lambda ctx, source: menus.MenuPages(
+            source, clear_reactions_after=True
+        ).start(ctx),
+    )
     async def google_image(self, ctx: main.NewCtx, *, query: str):
         """Searches an image on google"""
-        is_nsfw = ctx.channel.is_nsfw()
-        ctx.cache_key += [is_nsfw]
-
-        if not (source := ctx.cached_data):
-            source = await self.aiogoogle.do_search(
-                ctx, query=query, is_nsfw=is_nsfw, image_search=True
-            )
-
-        menu = menus.MenuPages(source, clear_reactions_after=True)
-
-        await menu.start(ctx)
+        return await self.aiogoogle.do_search(
+            query=query, is_nsfw=ctx.channel.is_nsfw(), image_search=True
+        )
 
     @commands.command(name="screenshot")
     @commands.cooldown(1, 15, commands.BucketType.user)
+    @main.cached(
+        timeout=datetime.timedelta(minutes=15),
+        stale_after=datetime.timedelta(minutes=5),
+        key=main.nsfw_key,
+    )
     async def screenshot(self, ctx: main.NewCtx, url: str):
         """Screenshots a website"""
         is_nsfw = ctx.channel.is_nsfw()
-        ctx.cache_key += [is_nsfw]
-
-        if not (embed := ctx.cached_data):
-
-            if not is_nsfw or len(url.split(".")) < 2:
-                url = await self.aioscreen.check_url(url=url, is_nsfw=is_nsfw)
-
-            response = await self.aioscreen.fetch_snapshot(url)
-            embed = self.aioscreen.format_snapshot(response=response, is_nsfw=is_nsfw)
 
-            ctx.add_to_cache(embed, timeout=datetime.timedelta(minutes=5))
+        if not is_nsfw or len(url.split(".")) < 2:
+            url = await self.aioscreen.check_url(url=url, is_nsfw=is_nsfw)
 
-        await ctx.send(embed=embed)
+        response = await self.aioscreen.fetch_snapshot(url)
+        return self.aioscreen.format_snapshot(response=response, is_nsfw=is_nsfw)
 
     @commands.group(invoke_without_command=True, aliases=['d'])
     async def dice(self, ctx, *dice: converters.Dice):
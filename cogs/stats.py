@@ -21,11 +21,128 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
-from datetime import datetime
+from collections import Counter
+from datetime import date, datetime, timezone
 from functools import wraps
+from logging import getLogger
+from typing import Optional
 
 import discord
 from discord.ext import commands, tasks
+from main import flush_logged
+from utils import db
+
+log = getLogger(__name__)
+
+# days are cut in UTC on both sides, current_date would follow the session's
+# timezone and disagree with utc_today() around midnight
+TODAY = "(now() AT TIME ZONE 'utc')::date"
+
+
+FLUSH_DAILY = f"""
+INSERT INTO stats_daily (guild_id, day, joined_numb, left_numb)
+SELECT guild_id, {TODAY}, joined, left_
+FROM unnest($1::bigint[], $2::int[], $3::int[]) AS c(guild_id, joined, left_)
+ON CONFLICT (guild_id, day) DO UPDATE
+SET joined_numb = stats_daily.joined_numb + excluded.joined_numb,
+    left_numb = stats_daily.left_numb + excluded.left_numb;
+"""
+
+# the history from before stats_daily existed, only run when it's created
+BACKFILL_DAILY = """
+INSERT INTO stats_daily (guild_id, day, joined_numb, left_numb)
+SELECT guild_id, days::date, SUM(joined_numb), SUM(left_numb)
+FROM stats
+GROUP BY 1, 2
+ON CONFLICT DO NOTHING;
+"""
+
+# at most 30 rows per guild, read through the primary key,
+# guilds without any of them get zeroes so their summary still moves on
+REFRESH_SUMMARY = f"""
+INSERT INTO stats_summary (
+    guild_id, as_of, day_joined, day_left, prev_joined, prev_left,
+    seven_joined, seven_left, avg_joined_seven, avg_left_seven,
+    thirty_joined, thirty_left, avg_joined_thirty, avg_left_thirty
+)
+SELECT g.guild_id,
+    {TODAY},
+    COALESCE(SUM(joined_numb) FILTER (WHERE day = {TODAY}), 0),
+    COALESCE(SUM(left_numb) FILTER (WHERE day = {TODAY}), 0),
+    COALESCE(SUM(joined_numb) FILTER (WHERE day = {TODAY} - 1), 0),
+    COALESCE(SUM(left_numb) FILTER (WHERE day = {TODAY} - 1), 0),
+    COALESCE(SUM(joined_numb) FILTER (WHERE day > {TODAY} - 7), 0),
+    COALESCE(SUM(left_numb) FILTER (WHERE day > {TODAY} - 7), 0),
+    COALESCE(AVG(joined_numb) FILTER (WHERE day > {TODAY} - 7), 0),
+    COALESCE(AVG(left_numb) FILTER (WHERE day > {TODAY} - 7), 0),
+    COALESCE(SUM(joined_numb), 0),
+    COALESCE(SUM(left_numb), 0),
+    COALESCE(AVG(joined_numb), 0),
+    COALESCE(AVG(left_numb), 0)
+FROM unnest($1::bigint[]) AS g(guild_id)
+LEFT JOIN stats_daily AS d ON d.guild_id = g.guild_id AND d.day > {TODAY} - 30
+GROUP BY g.guild_id
+ON CONFLICT (guild_id) DO UPDATE
+SET as_of = excluded.as_of,
+    day_joined = excluded.day_joined,
+    day_left = excluded.day_left,
+    prev_joined = excluded.prev_joined,
+    prev_left = excluded.prev_left,
+    seven_joined = excluded.seven_joined,
+    seven_left = excluded.seven_left,
+    avg_joined_seven = excluded.avg_joined_seven,
+    avg_left_seven = excluded.avg_left_seven,
+    thirty_joined = excluded.thirty_joined,
+    thirty_left = excluded.thirty_left,
+    avg_joined_thirty = excluded.avg_joined_thirty,
+    avg_left_thirty = excluded.avg_left_thirty;
+"""
+
+
+def utc_today() -> date:
+    """The same day as TODAY in the queries"""
+    return datetime.now(timezone.utc).date()
+
+
+class StatsDaily(db.Table, table_name="stats_daily"):
+    """Joins and leaves rolled up per guild and per day"""
+
+    guild_id = db.Column(db.Integer(big=True), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    joined_numb = db.Column(db.Integer, default=0)
+    left_numb = db.Column(db.Integer, default=0)
+
+    @classmethod
+    async def create(cls, *, connection=None, **kwargs):
+        """Creates the table, filling it from the stats history the first time"""
+        created = await super().create(connection=connection, **kwargs)
+        if created:
+            async with cls.acquire_connection(connection) as con:
+                if await con.fetchval("SELECT to_regclass('stats')") is not None:
+                    await con.execute(BACKFILL_DAILY)
+        return created
+
+
+class StatsSummary(db.Table, table_name="stats_summary"):
+    """
+    What show_stats displays, refreshed from stats_daily on every flush.
+    as_of is the day the windows were computed for.
+    """
+
+    guild_id = db.Column(db.Integer(big=True), primary_key=True)
+    as_of = db.Column(db.Date)
+    day_joined = db.Column(db.Integer)
+    day_left = db.Column(db.Integer)
+    prev_joined = db.Column(db.Integer)
+    prev_left = db.Column(db.Integer)
+    seven_joined = db.Column(db.Integer)
+    seven_left = db.Column(db.Integer)
+    avg_joined_seven = db.Column(db.Float)
+    avg_left_seven = db.Column(db.Float)
+    thirty_joined = db.Column(db.Integer)
+    thirty_left = db.Column(db.Integer)
+    avg_joined_thirty = db.Column(db.Float)
+    avg_left_thirty = db.Column(db.Float)
 
 
 class DataNotFound(commands.CommandError):
@@ -36,14 +153,7 @@ def caching():
     def wrapper(func):
         @wraps(func)
         async def wrapped(*args, **kwargs):
-            guild = args[1].guild
-            if guild.id in args[0].tracked and args[0].tracking:
-                return await func(*args, **kwargs)
-            async with args[0].bot.pool.acquire() as con:
-                query = """SELECT stats_enabled AS activated FROM guild_config WHERE guild_id= $1 """
-                activated = await con.fetchrow(query, guild.id)
-            if activated and activated["activated"]:
-                args[0].tracked.append(guild.id)
+            if args[0].is_tracked(args[1].guild.id):
                 return await func(*args, **kwargs)
 
         return wrapped
@@ -55,87 +165,135 @@ class Stats(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.tracking = True
-        self.tracked = []
+        self.tracked = set()
+        self.untracked = set()
+        self.joined = Counter()
+        self.left = Counter()
+        self.summaries = {}  # guild_id -> StatsSummary.Row, valid until a flush
+        # another process can flip stats_enabled, the mirror tells us when
+        self.bot.guild_config.change_listeners.append(self.forget)
         self.db_task.start()
+        self.flush_counts.start()
+
+    def is_tracked(self, guild_id: int) -> bool:
+        """Whether the guild opted in, both answers are remembered"""
+        if self.tracking:
+            if guild_id in self.tracked:
+                return True
+            if guild_id in self.untracked:
+                return False
+
+        if enabled := self.bot.guild_config.stats_enabled(guild_id):
+            self.tracked.add(guild_id)
+        else:
+            self.untracked.add(guild_id)
+        return enabled
+
+    def forget(self, guild_id: Optional[int]):
+        """Drops what is remembered about the guild, or every guild when None"""
+        if guild_id is None:
+            self.tracked.clear()
+            self.untracked.clear()
+        else:
+            self.tracked.discard(guild_id)
+            self.untracked.discard(guild_id)
+
+    async def flush(self):
+        """Writes the joins and leaves counted since the last flush"""
+        if not (self.joined or self.left):
+            return
+
+        joined, self.joined = self.joined, Counter()
+        left, self.left = self.left, Counter()
+        guild_ids = list(joined.keys() | left.keys())
+        args = (
+            guild_ids,
+            [joined[guild_id] for guild_id in guild_ids],
+            [left[guild_id] for guild_id in guild_ids],
+        )
+        try:
+            async with self.bot.pool.acquire() as conn:
+                async with conn.transaction():
+                    # the procedure keeps the stats table, once per join or leave
+                    await conn.executemany(
+                        "CALL evaluate_data($1, $2)",
+                        [
+                            (guild_id, joining)
+                            for counts, joining in ((joined, True), (left, False))
+                            for guild_id, amount in counts.items()
+                            for _ in range(amount)
+                        ],
+                    )
+                    await conn.execute(FLUSH_DAILY, *args)
+                    await conn.execute(REFRESH_SUMMARY, guild_ids)
+        except Exception:
+            # keep them for the next flush rather than losing them
+            self.joined.update(joined)
+            self.left.update(left)
+            raise
+        finally:
+            for guild_id in guild_ids:
+                self.summaries.pop(guild_id, None)
+
+    async def summary(self, guild_id: int):
+        """The guild's StatsSummary row, recomputed when it's from another day"""
+        today = utc_today()
+        summary = self.summaries.get(guild_id)
+        if summary is None or summary.as_of != today:
+            summary = await StatsSummary.get(guild_id=guild_id)
+            # never computed yet, or nobody joined or left since and
+            # the windows still have to slide
+            if summary is None or summary.as_of != today:
+                await self.bot.pool.execute(REFRESH_SUMMARY, [guild_id])
+                summary = await StatsSummary.get(guild_id=guild_id)
+            if summary is not None:
+                self.summaries[guild_id] = summary
+        return summary
+
+    @tasks.loop(seconds=30)
+    async def flush_counts(self):
+        await flush_logged(self.flush, "the stats")
+
+    @flush_counts.after_loop
+    async def after_flush_counts(self):
+        await flush_logged(self.flush, "the stats")
+
+    def cog_unload(self):
+        self.bot.guild_config.change_listeners.remove(self.forget)
+        self.flush_counts.cancel()
+        self.db_task.cancel()
 
     @tasks.loop(minutes=15)
     async def db_task(self):
-        async with self.bot.pool.acquire() as conn:
-            await conn.executemany(
-                "CALL evaluate_data($1)", [(x) for x in self.tracked]
-            )
+        await flush_logged(self.flush, "the stats")
+        try:
+            async with self.bot.pool.acquire() as conn:
+                await conn.executemany(
+                    "CALL evaluate_data($1)",
+                    [(guild_id,) for guild_id in self.tracked],
+                )
+        except Exception:
+            log.exception("Could not evaluate the stats")
 
     @commands.command()
     @commands.has_permissions(manage_guild=True)
     async def enable_stats(self, ctx):
-        self.tracked.append(ctx.guild.id)
-        query = """
-                INSERT INTO guild_config(guild_id, stats_enabled)
-                VALUES($1, true)
-                ON CONFLICT (guild_id)
-                DO UPDATE SET stats_enabled = true
-                """
-        await self.bot.pool.execute(query, ctx.guild.id)
+        await self.bot.guild_config.set_stats_enabled(ctx.guild.id, True)
+        self.forget(ctx.guild.id)
         await ctx.send("The stats were successfully activated for this server.")
 
     @commands.command()
     @commands.has_permissions(manage_guild=True)
     async def disable_stats(self, ctx):
-        self.tracked.remove(ctx.guild.id)
-        query = """
-                INSERT INTO guild_config(guild_id, stats_enabled)
-                VALUES($1, false)
-                ON CONFLICT (guild_id)
-                DO UPDATE SET stats_enabled = false
-                """
-        await self.bot.pool.execute(query, ctx.guild.id)
+        await self.bot.guild_config.set_stats_enabled(ctx.guild.id, False)
+        self.forget(ctx.guild.id)
         await ctx.send("The stats were successfully disabled for this server.")
 
     @commands.command()
     @commands.cooldown(1, 15, commands.BucketType.guild)
     @caching()
     async def show_stats(self, ctx):
-        query = """
-        WITH one_day AS(
-            SELECT guild_id,
-            joined_numb AS "day_joined",
-            left_numb AS "day_left",
-            joined_numb - (SELECT joined_numb FROM stats WHERE  age(now(), days) BETWEEN INTERVAL '1 DAY' AND '2 DAYS') AS "difference_join",
-            left_numb - (SELECT left_numb FROM stats WHERE age(now(),days) BETWEEN INTERVAL '1 DAY' AND '2 DAYS') AS "difference_left"
-            FROM stats
-            WHERE age(days) <= INTERVAL '1 days'
-        ),
-        seven_days AS(
-            SELECT guild_id,
-            SUM(joined_numb) AS "seven_joined",
-            SUM(left_numb) AS "seven_left",
-            AVG(joined_numb) AS "avg_joined_seven",
-            AVG(left_numb) AS "avg_left_seven"
-            FROM stats
-            WHERE age(now(), days) <= INTERVAL '7day'
-            GROUP BY guild_id
-        ),
-        left_days AS(
-            SELECT guild_id,
-            SUM(joined_numb) AS "left_joined",
-            SUM(left_numb) AS "left_left",
-            AVG(joined_numb) AS "avg_joined_left",
-            AVG(left_numb) AS "avg_left_left"
-            FROM stats
-            WHERE age(now(), days) <= INTERVAL '30 days'
-            GROUP BY guild_id
-        )
-        SELECT
-        one_day.*,
-        left_days.*,
-        seven_days.*
-        FROM left_days
-        INNER JOIN one_day ON one_day.guild_id = left_days.guild_id
-        INNER JOIN seven_days ON seven_days.guild_id = left_days.guild_id
-        WHERE left_days.guild_id = $1
-        """
-        async with self.bot.pool.acquire() as conn:
-            result = await conn.fetchrow(query, ctx.guild.id)
+        result = await self.summary(ctx.guild.id)
         if result is None:
             raise DataNotFound("Data was not found in the database")
         embed = discord.Embed(colour=discord.Color.blurple(), timestamp=datetime.now())
@@ -144,34 +302,34 @@ class Stats(commands.Cog):
         down_arrow = "<:down:715574958176337920>"
         stats_joined = ""
         stats_left = ""
-        if d_join := (result["difference_join"]):
+        if d_join := (result.day_joined - result.prev_joined):
             if d_join < 0:
                 stats_joined = f"{down_arrow} {d_join}"
             else:
                 stats_joined = f"{up_arrow} {d_join}"
-        if d_left := (result["difference_left"]):
+        if d_left := (result.day_left - result.prev_left):
             if d_left < 0:
                 stats_left = f"{down_arrow} {d_left}"
             else:
                 stats_left = f"{up_arrow} {d_left}"
         embed.add_field(
             name="\U0001f55aStats for the last 24 hours",
-            value=f"Members who have joined:{result['day_joined']} {stats_joined}\n"
-            f"Members who have left: {result['day_left']}{stats_left}",
+            value=f"Members who have joined:{result.day_joined} {stats_joined}\n"
+            f"Members who have left: {result.day_left}{stats_left}",
         )
         embed.add_field(
             name="\U0000231bStats for the last 7 days",
-            value=f"Members who have joined:{result['seven_joined']:.1f}\n"
-            f"Members who have left:{result['seven_left']:.1f}\n"
-            f"Average joins:{result['avg_joined_seven']:.1f}\n"
-            f"Average quits:{result['avg_joined_seven']:.1f}",
+            value=f"Members who have joined:{result.seven_joined:.1f}\n"
+            f"Members who have left:{result.seven_left:.1f}\n"
+            f"Average joins:{result.avg_joined_seven:.1f}\n"
+            f"Average quits:{result.avg_left_seven:.1f}",
         )
         embed.add_field(
             name="\U0001f5d3 Stats for the last 30 days",
-            value=f"Members who have joined:{result['left_joined']:.1f}\n"
-            f"Members who have left:{result['left_left']:.1f}\n"
-            f"Average joins:{result['avg_joined_left']:.1f}\n"
-            f"Average quits:{result['avg_left_left']:.1f}",
+            value=f"Members who have joined:{result.thirty_joined:.1f}\n"
+            f"Members who have left:{result.thirty_left:.1f}\n"
+            f"Average joins:{result.avg_joined_thirty:.1f}\n"
+            f"Average quits:{result.avg_left_thirty:.1f}",
         )
         await ctx.send(embed=embed)
 
@@ -184,12 +342,16 @@ class Stats(commands.Cog):
     @caching()
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
-        await self.bot.pool.execute("CALL evaluate_data($1, true)", member.guild.id)
+        self.joined[member.guild.id] += 1
 
     @caching()
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member):
-        await self.bot.pool.execute("CALL evaluate_data($1, false)", member.guild.id)
+        self.left[member.guild.id] += 1
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.forget(guild.id)
 
 
 def setup(bot):
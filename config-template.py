@@ -4,6 +4,36 @@ BOT_TOKEN = "TOKEN HERE"
 PREFIX = "yoink "
 PSQL_DETAILS = "postgres://<user>:<password>@<IP/Addr>:<Port>/<database_name>"
 
+# ? Seconds a statement may take before it's written to the slow query log
+# ? (the yert.slow_queries logger), None to disable it
+SLOW_QUERY_THRESHOLD = 0.5
+
+# ? SQLite file backing the persistent cache regions, None to disable it
+CACHE_STORE = "cache.sqlite3"
+
+# ? Upper bounds of each cache region, None to leave it unbounded
+CACHE_MAX_ENTRIES = 5_000
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# ? Per cog overrides, the keys are the lowercased cog names
+# ? persistent regions are also kept in CACHE_STORE across restarts
+# ? pack_embeds / compress_embeds keep embeds serialized to save memory
+CACHE_REGIONS = {
+    "anime": {
+        "timeout": 24 * 3600,
+        "max_bytes": 128 * 1024 * 1024,
+        "persistent": True,
+    },
+    "practical": {
+        "timeout": 600,
+        "max_entries": 10_000,
+        "persistent": True,
+        "pack_embeds": True,
+    },
+    "meta": {"compress_embeds": True},
+    "fun": {"timeout": 1800, "max_entries": 20_000, "max_bytes": None},
+}
+
 # ? Webhook tuple. Webhook ID as int then secret as a string.
 WEBHOOK = (710260377199575072,
            "rJASHh1omoW7F8AAPHqh2gGTG_gNIZ6ZC1G2FMRDXPPcDa99")
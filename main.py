@@ -24,18 +24,24 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR
 import asyncio
 from collections.abc import Hashable
 from datetime import datetime, timedelta, timezone
+from hashlib import blake2b
+from functools import partial, wraps
+from io import BytesIO
 import json
+from logging import getLogger
 import traceback
-from typing import Any, Tuple, Union
+from typing import Any, Awaitable, Callable, Iterable, NamedTuple, Tuple, Type, Union
 
 import discord
 from aiohttp import ClientSession
-from discord.ext import commands
+from discord.ext import commands, menus
 
 import config
-from utils.containers import TimedCache
-from utils.db import Table
+from utils.containers import CacheRegions, TimedCache
+from utils.db import Table, create_tables
 from utils.formatters import BetterEmbed
+from utils.guild_config import GuildConfig
+from utils.persistence import CacheStore
 
 COGS = (
     "jishaku",
@@ -54,6 +60,10 @@ COGS = (
     "cogs.catposts"
 )
 
+log = getLogger("yert")
+
+MAX_KEY_PART = 256  # longer strings are digested when used in a cache key
+
 
 class NewCtx(commands.Context):
     """Custom context for extra functions"""
@@ -80,6 +90,7 @@ class NewCtx(commands.Context):
         self._state = self.message._state
 
         self._altered_cache_key = None
+        self._altered_cache_region = None
 
     async def webhook_send(
         self,
@@ -131,20 +142,60 @@ class NewCtx(commands.Context):
         kwargs = [val for val in self.kwargs.values()]
         return args + kwargs
 
+    @staticmethod
+    def _key_part(part: Any) -> Hashable:
+        """Replaces large or unhashable parts of a key with a fixed size digest"""
+        if isinstance(part, discord.Attachment):
+            part = part.url
+        elif isinstance(part, BytesIO):
+            part = part.getbuffer()
+
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            return blake2b(part, digest_size=16).hexdigest()
+
+        if isinstance(part, str):
+            if len(part) <= MAX_KEY_PART:
+                return part
+            return blake2b(part.encode(), digest_size=16).hexdigest()
+
+        try:
+            hash(part)
+        except TypeError:
+            return blake2b(repr(part).encode(), digest_size=16).hexdigest()
+        return part
+
     @property
     def cache_key(self) -> list:
         """Returns the key used to access the cache"""
-        return self._altered_cache_key or [self.qname] + self.all_args
+        if self._altered_cache_key:
+            return self._altered_cache_key
+        return [self.qname] + [self._key_part(arg) for arg in self.all_args]
 
     @cache_key.setter
     def cache_key(self, key: Hashable) -> None:
         """Sets another key to use for this Context"""
-        self._altered_cache_key = key
+        self._altered_cache_key = [self._key_part(part) for part in key]
+
+    @property
+    def cache_region(self) -> str:
+        """Returns the name of the cache region used, defaults to the cog's"""
+        if self._altered_cache_region:
+            return self._altered_cache_region
+        cog = self.cog
+        if cog is None and self.command is not None:
+            # subcommands attached at runtime don't get a cog, their parents do
+            cog = next((p.cog for p in self.command.parents if p.cog), None)
+        return getattr(cog, "qualified_name", "default").lower()
+
+    @cache_region.setter
+    def cache_region(self, name: str) -> None:
+        """Sets another region to use for this Context"""
+        self._altered_cache_region = name
 
     @property
     def cache(self) -> TimedCache:
-        """Returns the cache tied to the bot"""
-        return self.bot.cache
+        """Returns the bot's cache region tied to this Context"""
+        return self.bot.cache.region(self.cache_region)
 
     @property
     def cached_data(self) -> Union[Any, None]:
@@ -159,6 +210,109 @@ class NewCtx(commands.Context):
             key=tuple(key or self.cache_key), value=value, timeout=timeout
         )
 
+    async def fetch_cached(
+        self,
+        factory: Callable[[], Awaitable[Any]],
+        *,
+        timeout: Union[int, timedelta] = None,
+        stale_after: Union[int, timedelta] = None,
+        negative: Tuple[Type[Exception], ...] = (),
+        key: Hashable = None,
+    ) -> Any:
+        """Retrieves cached data, or fetches it once for every concurrent caller"""
+        return await self.cache.fetch(
+            tuple(key or self.cache_key),
+            factory,
+            timeout=timeout,
+            stale_after=stale_after,
+            negative=negative,
+        )
+
+
+async def send_cached(ctx: NewCtx, value: Any) -> None:
+    """Sends a cached command result, depending on what it is"""
+    if isinstance(value, discord.Embed):
+        await ctx.send(embed=value)
+    elif isinstance(value, menus.PageSource):
+        await menus.MenuPages(value, delete_message_after=True).start(ctx)
+    else:
+        await ctx.send(value)
+
+
+class DetachedContext(NamedTuple):
+    """
+    What the body of a command refreshed in the background gets instead
+    of its Context, the cache keeps it so it must not hold the message
+    """
+
+    bot: commands.Bot
+    guild: Any
+    channel: Any
+
+
+def cached(
+    *,
+    timeout: Union[int, timedelta] = None,
+    stale_after: Union[int, timedelta] = None,
+    key: Callable[[NewCtx], Iterable[Hashable]] = None,
+    send: Callable[[NewCtx, Any], Awaitable[Any]] = send_cached,
+    negative: Tuple[Type[Exception], ...] = (commands.BadArgument,),
+):
+    """
+    Caches what a command returns, then sends it
+
+    The command's body only runs on a miss, concurrent misses share it.
+    `key` returns extra parts to add to the cache key, and `send`
+    is used to send the result, embeds, page sources and strings
+    are handled by default. The errors in `negative` are cached too,
+    for the region's negative timeout
+
+    With stale_after the body can be re-run later, so it gets
+    a DetachedContext instead of the Context
+    """
+
+    def wrapper(func):
+        @wraps(func)
+        async def wrapped(*args, **kwargs):
+            # cog commands get self first, the others just ctx
+            ctx: NewCtx = args[1] if isinstance(args[0], commands.Cog) else args[0]
+
+            if key is not None:
+                ctx.cache_key += list(key(ctx))
+
+            call_args = args
+            if stale_after is not None:
+                detached = DetachedContext(ctx.bot, ctx.guild, ctx.channel)
+                call_args = [detached if arg is ctx else arg for arg in args]
+
+            value = await ctx.fetch_cached(
+                partial(func, *call_args, **kwargs),
+                timeout=timeout,
+                stale_after=stale_after,
+                negative=negative,
+            )
+            await send(ctx, value)
+
+        return wrapped
+
+    return wrapper
+
+
+def nsfw_key(ctx: NewCtx) -> Tuple[bool]:
+    """Cache key part for commands whose result depend on the channel's nsfw state"""
+    return (ctx.channel.is_nsfw(),)
+
+
+async def flush_logged(flush: Callable[[], Awaitable[Any]], what: str) -> None:
+    """
+    Runs a flush from a tasks.loop, logging what it raises
+    since the loop would otherwise stop for good
+    """
+    try:
+        await flush()
+    except Exception:
+        log.exception("Could not flush %s", what)
+
 
 class Bot(commands.Bot):
     """ Our main bot-ty bot. """
@@ -174,14 +328,28 @@ class Bot(commands.Bot):
             )
 
     async def connect(self, *, reconnect=True):
-        self.prefixes = {}
-
         self._session = ClientSession(loop=self.loop)
         self._headers = {"Range": "bytes=0-10"}
-        self._cache = TimedCache(loop=self.loop)
+        if CACHE_STORE := getattr(config, "CACHE_STORE", None):
+            CACHE_STORE = CacheStore(CACHE_STORE, loop=self.loop)
+        self._cache = CacheRegions(
+            policies=getattr(config, "CACHE_REGIONS", None),
+            store=CACHE_STORE,
+            max_entries=getattr(config, "CACHE_MAX_ENTRIES", None),
+            max_bytes=getattr(config, "CACHE_MAX_BYTES", None),
+            loop=self.loop,
+        )
         self._before_invoke = self.before_invoke
         if PSQL_DETAILS := getattr(config, "PSQL_DETAILS", None):
-            self._pool = await Table.create_pool(PSQL_DETAILS, command_timeout=60)
+            self._pool = await Table.create_pool(
+                PSQL_DETAILS,
+                command_timeout=60,
+                slow_query_threshold=getattr(config, "SLOW_QUERY_THRESHOLD", 0.5),
+            )
+        self.guild_config = GuildConfig(
+            self.pool, default_prefix=config.PREFIX, dsn=PSQL_DETAILS, loop=self.loop
+        )
+        await self.guild_config.start()
 
         # Extension load
         for extension in COGS:
@@ -207,6 +375,10 @@ class Bot(commands.Bot):
                 output = f"```{output}```"
                 await hook.send(output)
 
+        if PSQL_DETAILS:
+            # the cogs define the tables, so this has to wait for them
+            await create_tables(*Table.all_tables(), verbose=False)
+
         with open('catpost.json') as file:
             data = json.load(file)
         self._cached_ids = data
@@ -223,26 +395,15 @@ class Bot(commands.Bot):
         return await super().get_context(message, cls=cls or NewCtx)
 
     async def get_prefix(self, message):
+        """
+        Served from the guild config mirror, never waits on the database
 
+        Only the prefix the message starts with is returned, or nothing,
+        so discord.py doesn't try each of them in turn
+        """
         if message.guild:
-            ret = self.prefixes.get(message.guild.id)
-            if not ret:
-                if ret := await self.pool.fetchval(
-                    "SELECT prefixes FROM guild_config WHERE guild_id = $1",
-                    message.guild.id,
-                ):
-                    self.prefixes[message.guild.id] = ret
-                else:
-                    await self.pool.execute(
-                        """INSERT INTO guild_config (guild_id, prefixes)
-                                                VALUES ($1, $2)
-                                                ON CONFLICT (guild_id)
-                                                DO UPDATE SET prefixes = $2;""",
-                        message.guild.id,
-                        [config.PREFIX],
-                    )
-                    self.prefixes[message.guild.id] = [config.PREFIX]
-            return self.prefixes[message.guild.id]
+            matcher = self.guild_config.matcher(message.guild.id)
+            return matcher.match(message.content) or ()
 
         else:
             return config.PREFIX
@@ -274,6 +435,22 @@ class Bot(commands.Bot):
         except (KeyError, AttributeError):
             pass
         finally:
+            steps = []
+            if games := self.cogs.get("Games"):
+                steps.append(("the games", games.flush))
+            if stats := self.cogs.get("Stats"):
+                steps.append(("the stats", stats.flush))
+            if store := getattr(self.cache, "store", None):
+                steps.append(("the cache store", store.close))
+            if guild_config := getattr(self, "guild_config", None):
+                steps.append(("the guild config", guild_config.close))
+
+            # one failing, the database being down say, mustn't stop the others
+            for name, step in steps:
+                try:
+                    await step()
+                except Exception:
+                    log.exception("Could not close %s cleanly", name)
             await super().close()
 
 
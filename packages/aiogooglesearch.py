@@ -22,28 +22,24 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-from datetime import timedelta
 from typing import List
 
 from async_cse import Result as GoogleResponse
 from async_cse import Search as BaseGoogleSearch
 from discord.ext.menus import ListPageSource
-from main import NewCtx
 from utils.formatters import BetterEmbed
 
 
 class AioSearchEngine(BaseGoogleSearch):
     async def do_search(
-        self, ctx: NewCtx, *, query: str, is_nsfw: bool, image_search: bool = False
+        self, *, query: str, is_nsfw: bool, image_search: bool = False
     ) -> ListPageSource:
         """Searches stuff and returns the formatted version of it"""
         results = await self.search(
             query, safesearch=not is_nsfw, image_search=image_search
         )
 
-        return ctx.add_to_cache(
-            GoogleSource(results, is_nsfw), timeout=timedelta(minutes=5)
-        )
+        return GoogleSource(results, is_nsfw)
 
 
 class GoogleSource(ListPageSource):
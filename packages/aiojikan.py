@@ -26,7 +26,7 @@ from dataclasses import dataclass
 from functools import partial as funct_partial
 from typing import List, Tuple, Union
 
-from discord.ext.commands import BucketType, CooldownMapping
+from discord.ext.commands import BadArgument, BucketType, CooldownMapping
 from discord.ext.menus import ListPageSource
 from jikanpy import AioJikan
 from utils.converters import to_human_datetime, try_unpack_class
@@ -294,4 +294,7 @@ class Client(AioJikan):
             )
         ]
 
+        if not response.results:
+            raise BadArgument(message=f"Couldn't find any {search_type} for {query}")
+
         return response
@@ -25,7 +25,6 @@ SOFTWARE.
 from __future__ import annotations
 
 import asyncio
-from datetime import timedelta
 from functools import partial
 from typing import TYPE_CHECKING, Dict, Union
 
@@ -90,10 +89,9 @@ class AioTranslator(BaseTranslator):
         return embed.add_fields(fields)
 
     async def do_translation(
-        self, *, ctx, text: str, translation_kwarg: Dict[str, str]
+        self, *, text: str, translation_kwarg: Dict[str, str]
     ) -> BetterEmbed:
         """Does the translation and formats it"""
         func = partial(self.translate, text, **translation_kwarg)
         resp = await self.loop.run_in_executor(None, func)
-        embed = self.format_resp(resp=resp, text=text)
-        return ctx.add_to_cache(value=embed, timeout=timedelta(minutes=60))
+        return self.format_resp(resp=resp, text=text)
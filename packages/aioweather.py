@@ -27,6 +27,7 @@ from datetime import datetime as dt
 from datetime import timezone as tz
 
 from aiohttp import ClientSession
+from discord.ext.commands import BadArgument, CommandError
 from humanize import naturaltime
 from utils.formatters import BetterEmbed
 
@@ -125,7 +126,15 @@ class AioWeather:
         link = f"https://api.openweathermap.org/data/2.5/weather?q={city}&appid={self.api_key}"
 
         async with self.session.get(link) as r:
-            return WeatherResponse(await r.json())
+            data = await r.json()
+
+        # the api reports errors in the body, only an unknown city is cached
+        if (cod := str(data.get("cod"))) == "404":
+            raise BadArgument(message=f"Couldn't get the weather for {city}")
+        if cod != "200":  # rate limits and outages, worth trying again
+            raise CommandError(f"The weather service failed ({cod}), try again later")
+
+        return WeatherResponse(data)
 
     def format_weather(self, res: WeatherResponse, /) -> BetterEmbed:
         """Returns a formatted embed from the data received by the api"""
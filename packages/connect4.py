@@ -23,14 +23,13 @@ SOFTWARE.
 """
 
 import collections
-import contextlib
-import itertools
 import random
 import typing
 
 import discord
 import main
 from discord.ext import menus
+from packages.connect4_board import Board
 from utils import formatters
 
 
@@ -85,7 +84,6 @@ Player = collections.namedtuple("Player", ["id", "mention", "token_id"])
 
 
 class ConnectMenu(menus.Menu):
-    operators = ("-", "+")  # those should be all caps
     spacing_row = "\n" * 2
     spacing_column = " " * 2
     white_flag = "🏳️"
@@ -108,22 +106,13 @@ class ConnectMenu(menus.Menu):
         self.is_timeout_win = True
 
         self.players = [Player(p1.id, p1.mention, 1), Player(p2.id, p2.mention, -1)]
-        self.cycle_players = itertools.cycle((lambda x: [random.shuffle(x), x][1])(self.players))  # type: ignore
-        self.current_player: Player = next(self.cycle_players)
+        random.shuffle(self.players)
 
-        self.grid = grid = [
-            [0 for _ in range(column_amount)] for _ in range(row_amount)
-        ]
-
-        self.backup_grid = [
-            [0 for _ in range(column_amount)] for _ in range(row_amount)
-        ]  # less painful than deepcopy
+        self.board = Board(row_amount, column_amount, aligned_amount)
 
         title = f"Connect {self.aligned_amount} using {row_amount} rows and {column_amount} columns"
         self.embed_template = formatters.BetterEmbed(title=title)
 
-        self.max_offset = max(len(grid), len(grid[0]))
-
         self.keycaps = [
             str(n) + "\N{variation selector-16}\N{combining enclosing keycap}"
             for n in range(column_amount)
@@ -131,6 +120,10 @@ class ConnectMenu(menus.Menu):
 
         self.f_keycaps = self.spacing_column.join(self.keycaps)
 
+    @property
+    def current_player(self) -> Player:
+        return self.players[self.board.current]
+
     async def make_buttons(self, react: bool = False) -> None:
         """Adds all keycaps emojis as buttons"""
         for key in self.keycaps:
@@ -159,36 +152,36 @@ class ConnectMenu(menus.Menu):
         await self.make_buttons()
         await super().start(ctx, channel=channel, wait=wait)
 
-    def get_emoji(self, id_: int) -> str:
-        """Gets the emoji corresponding to the id"""
-        return self.emojis[id_]
+    def get_emoji(self, player: typing.Optional[int]) -> str:
+        """Gets the emoji of the player owning a cell"""
+        if player is None:
+            return self.emojis[0]
+        return self.emojis[self.players[player].token_id]
 
-    def format_row(self, row: typing.List[int]) -> str:
+    def format_row(self, row: typing.List[typing.Optional[int]]) -> str:
         """Formats a row xd"""
         return self.spacing_column.join(map(self.get_emoji, row))
 
-    def format_grid(self, grid: typing.List[typing.List[int]]) -> str:
-        """Formats the grid into an str"""
+    def format_grid(self) -> str:
+        """Formats the board into an str"""
         return (
-            f"```\n{self.spacing_row.join(map(self.format_row, grid))}"
+            f"```\n{self.spacing_row.join(map(self.format_row, self.board.grid()))}"
             f"{self.spacing_row}{self.f_keycaps}```"
         )
 
-    def to_send(
-        self, grid: typing.List[typing.List[int]], current_player: Player
-    ) -> typing.Dict[str, typing.Union[str, formatters.BetterEmbed]]:
+    def to_send(self) -> typing.Dict[str, typing.Union[str, formatters.BetterEmbed]]:
         """Formats the full message to send"""
         curr_player = self.current_player
         return {
             "content": curr_player.mention + " - " + self.emojis[curr_player.token_id],
-            "embed": self.embed_template(description=self.format_grid(grid)),
+            "embed": self.embed_template(description=self.format_grid()),
         }
 
     async def send_initial_message(
         self, ctx: main.NewCtx, channel: discord.abc.Messageable
     ) -> discord.Message:
         """Sends the initial grid"""
-        return await channel.send(**self.to_send(self.grid, self.current_player))
+        return await channel.send(**self.to_send())
 
     def reaction_check(self, payload: discord.RawReactionActionEvent) -> bool:
         if payload.message_id != self.message.id:
@@ -199,106 +192,28 @@ class ConnectMenu(menus.Menu):
 
         return payload.emoji in self.buttons
 
-    async def update_grid(
-        self,
-        payload: typing.Union[discord.RawReactionActionEvent, None],
-    ) -> typing.Union[typing.Tuple[int, int], typing.Tuple[None, None]]:
-        """Updates the displayed grid"""
-        row_index = None
-        column_index = None
-
-        if payload:
-            column_index = self.keycaps.index(str(payload.emoji))
-
-            column = [row[column_index] for row in self.grid]
-
-            for index, token_id in enumerate(
-                reversed(column)
-            ):  # for some reason I failed to make it work the other way around
-                if not token_id:
-                    break
-            else:
-                return None, None  # the column is filled
-
-            row_index = len(column) - (index + 1)
-            self.grid[row_index][column_index] = self.current_player.token_id
-            self.current_player = next(self.cycle_players)
-
-        await self.message.edit(**self.to_send(self.grid, self.current_player))
-
-        return row_index, column_index
-
-    def get_lines(
-        self, grid: typing.List[typing.List[int]], *, row_index: int, column_index: int
-    ) -> typing.List[typing.List[int]]:
-        """Gets all lines around the newly placed token"""
-        operators = self.operators
-        max_offset = self.max_offset
-
-        for line in (
-            grid[row_index],
-            [row[column_index] for row in grid],
-        ):  # horizontal, vertical
-            yield line
-
-        # sideways up to down, both ways
-        for left_operator, right_operator in (operators, reversed(operators)):
-            nums = []
-            for offset in range(max_offset * 2):
-
-                y_offset = row_index - max_offset + offset
-                x_offset = eval(
-                    f"column_index {left_operator} max_offset {right_operator} offset",
-                    locals(),
-                )
-
-                if min(y_offset, x_offset) < 0:
-                    continue
-
-                with contextlib.suppress(IndexError):
-                    nums.append(grid[y_offset][x_offset])
-
-            yield nums
-
-    def check_winner(self, lines: typing.List[typing.List[int]]):
-        """Checks all provided lines looking for n aligned tokens in a row"""
-        aligned_amount = self.aligned_amount
-
-        for line in lines:
-            for offset, _ in enumerate(line):
-                sliced = line[offset: offset + aligned_amount]
-                if abs(sum(sliced)) >= aligned_amount:
-                    return [p for p in self.players if p.token_id == sliced[0]][0]
-        else:
-            return None
-
-    async def check_filled_grid(self, grid: typing.List[typing.List[int]]) -> None:
-        """Checks if the grid is completely filled"""
-        if 0 not in grid[0]:
-            self.grid = self.backup_grid
-            await self.update_grid(None)
-
     async def on_keycap(self, payload: discord.RawReactionActionEvent) -> None:
         """Dispatches the keycaps"""
-        row_index, column_index = await self.update_grid(payload)
-        if None in {row_index, column_index}:
-            return
-
-        lines = [
-            *self.get_lines(self.grid, row_index=row_index, column_index=column_index)
-        ]
+        if self.board.play(self.keycaps.index(str(payload.emoji))) is None:
+            return  # the column is filled
 
-        if self.check_winner(lines):
+        if self.board.winner is not None:
             self.is_timeout_win = False
             return self.stop()
 
-        await self.check_filled_grid(self.grid)
+        if self.board.is_full():
+            self.board.reset()
+
+        await self.message.edit(**self.to_send())
 
     async def finalize(self) -> None:
         if self.is_timeout_win:
-            self.current_player = next(self.cycle_players)
+            # whoever had to play gave up or ran out of time
+            winner = self.players[1 - self.board.current]
+        else:
+            winner = self.players[self.board.winner]
 
         await self.message.edit(
-            embed=self.embed_template(description=self.format_grid(self.grid)),
-            content=self.current_player.mention + " won ! ",
+            embed=self.embed_template(description=self.format_grid()),
+            content=winner.mention + " won ! ",
         )
@@ -0,0 +1,124 @@
+"""
+MIT License
+
+Copyright (c) 2021 - µYert
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from typing import Iterator, List, Optional
+
+
+class Board:
+    """
+    A connect 4 game kept as one bitboard per player, no discord involved
+
+    Every column takes rows + 1 bits, bottom to top, the spare bit on top
+    of each column stays empty so a line never wraps into the next one
+    """
+
+    __slots__ = (
+        "rows",
+        "columns",
+        "aligned",
+        "boards",
+        "heights",
+        "current",
+        "moves",
+        "winner",
+        "_height",
+        "_shifts",
+        "_full",
+    )
+
+    def __init__(self, rows: int = 6, columns: int = 7, aligned: int = 4):
+        if aligned < 1:
+            raise ValueError("At least one token has to be aligned")
+
+        self.rows = rows
+        self.columns = columns
+        self.aligned = aligned
+        self._height = height = rows + 1
+        # vertical, horizontal, both diagonals
+        self._shifts = (1, height, height + 1, height - 1)
+        self._full = rows * columns
+        self.reset()
+
+    def reset(self) -> None:
+        """Empties the board, the first player is to move again"""
+        self.boards = [0, 0]
+        self.heights = [column * self._height for column in range(self.columns)]
+        self.current = 0
+        self.moves = 0
+        self.winner: Optional[int] = None
+
+    def can_play(self, column: int) -> bool:
+        return self.heights[column] < column * self._height + self.rows
+
+    def play(self, column: int) -> Optional[int]:
+        """
+        Drops the current player's token in the column,
+        returns the row it landed on counted from the top,
+        None if the column is full or the game is already won
+        """
+        if self.winner is not None or not self.can_play(column):
+            return None
+
+        bit = self.heights[column]
+        self.heights[column] += 1
+        player = self.current
+        self.boards[player] |= 1 << bit
+        self.moves += 1
+
+        if self.is_winner(player):
+            self.winner = player
+        self.current = 1 - player
+        return self.rows - 1 - (bit - column * self._height)
+
+    def is_winner(self, player: int) -> bool:
+        """Whether the player has `aligned` tokens in a row, in any direction"""
+        board = self.boards[player]
+        aligned = self.aligned
+        for shift in self._shifts:
+            # doubles the length of the runs each step
+            runs, length = board, 1
+            while length < aligned and runs:
+                step = min(length, aligned - length)
+                runs &= runs >> (shift * step)
+                length += step
+            if runs:
+                return True
+        return False
+
+    def is_full(self) -> bool:
+        return self.moves == self._full
+
+    def cell(self, row: int, column: int) -> Optional[int]:
+        """The player owning that cell, the row is counted from the top"""
+        bit = 1 << (column * self._height + self.rows - 1 - row)
+        if self.boards[0] & bit:
+            return 0
+        if self.boards[1] & bit:
+            return 1
+        return None
+
+    def grid(self) -> Iterator[List[Optional[int]]]:
+        """Every row from the top, as the players owning each cell"""
+        for row in range(self.rows):
+            yield [self.cell(row, column) for column in range(self.columns)]
@@ -0,0 +1,244 @@
+"""
+MIT License
+
+Copyright (c) 2021 - µYert
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import asyncio
+from datetime import datetime, timezone
+from logging import getLogger
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from utils import db
+
+log = getLogger(__name__)
+
+STARTING_AMOUNT = 150
+GRANTS = ("signup",)  # money given by the bot, not won from the house
+
+
+class GameData(db.Table, table_name="game_data"):
+    """Everyone's wins, losses and materialized balance"""
+
+    user_id = db.Column(db.Integer(big=True), primary_key=True)
+    wins = db.Column(db.Integer)
+    losses = db.Column(db.Integer)
+    amount = db.Column(db.Integer)
+
+
+class CurrencyLedger(db.Table, table_name="currency_ledger"):
+    """Every change to a balance, only ever appended to"""
+
+    id = db.Column(db.Integer(big=True, auto_increment=True), primary_key=True)
+    user_id = db.Column(db.Integer(big=True), index=True, nullable=False)
+    delta = db.Column(db.Integer, nullable=False)
+    game = db.Column(db.String, nullable=False)
+    created_at = db.Column(db.Datetime(timezone=True), nullable=False)
+
+
+class LedgerEntry(NamedTuple):
+    user_id: int
+    delta: int
+    game: str
+    created_at: datetime
+
+
+class Account:
+    """Someone's balance and record, authoritative once loaded"""
+
+    __slots__ = ("amount", "wins", "losses")
+
+    def __init__(self, amount: int, wins: int, losses: int):
+        self.amount = amount
+        self.wins = wins
+        self.losses = losses
+
+
+class Ledger:
+    """
+    Keeps the accounts in memory and the history in currency_ledger
+
+    Moves are checked and applied to the in-memory account right away.
+    They are written behind in batches by flush: the moves are appended
+    to the ledger, and the summed deltas of amount, wins and losses are
+    added to game_data in a single UPDATE. A flush happens every
+    flush_after moves, on top of the caller's timer.
+
+    The house has no row to fight over, its total is aggregated
+    from what the players won and lost, on top of what its game_data
+    row held before the ledger existed
+    """
+
+    def __init__(self, *, flush_after: int = 200):
+        self.accounts: Dict[int, Account] = {}
+        self.flush_after = flush_after
+        self._pending: List[LedgerEntry] = []
+        self._deltas: Dict[int, List[int]] = {}  # user -> [amount, wins, losses]
+        self._flushing = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def account(self, user_id: int) -> Optional[Account]:
+        """Returns someone's account, None if they don't have one"""
+        if (account := self.accounts.get(user_id)) is not None:
+            return account
+
+        row = await GameData.get(user_id=user_id)
+        if row is None:
+            return None
+        # someone else might have loaded it while we were waiting
+        return self.accounts.setdefault(
+            user_id, Account(row.amount or 0, row.wins or 0, row.losses or 0)
+        )
+
+    async def balance(self, user_id: int) -> Optional[int]:
+        """Returns someone's balance, None if they don't have an account"""
+        account = await self.account(user_id)
+        return account.amount if account is not None else None
+
+    async def open_account(self, user_id: int) -> Account:
+        """Makes sure someone has an account and returns it"""
+        created = await GameData.upsert(
+            overwrite=False, user_id=user_id, wins=0, losses=0, amount=0
+        )
+        if created is None:
+            return await self.account(user_id)
+
+        # the starting amount goes through the ledger like everything else
+        account = self.accounts[user_id] = Account(0, 0, 0)
+        self.record(user_id, STARTING_AMOUNT, GRANTS[0])
+        return account
+
+    def record(
+        self, user_id: int, delta: int, game: str, *, won: Optional[bool] = None
+    ) -> Optional[int]:
+        """
+        Moves money in or out of someone's loaded account, and counts
+        a win or a loss if won is given. Returns the new balance,
+        or None if they can't cover it or their account was deleted meanwhile
+        """
+        if (account := self.accounts.get(user_id)) is None:
+            return None
+        if (amount := account.amount + delta) < 0:
+            return None
+
+        deltas = self._deltas.setdefault(user_id, [0, 0, 0])
+        account.amount = amount
+        deltas[0] += delta
+        if won is not None:
+            if won:
+                account.wins += 1
+                deltas[1] += 1
+            else:
+                account.losses += 1
+                deltas[2] += 1
+
+        self._pending.append(
+            LedgerEntry(user_id, delta, game, datetime.now(tz=timezone.utc))
+        )
+        if len(self._pending) >= self.flush_after and self._flush_task is None:
+            self._flush_task = asyncio.get_event_loop().create_task(
+                self._flush_soon()
+            )
+        return amount
+
+    async def _flush_soon(self) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            log.exception("Could not flush the ledger")
+        finally:
+            self._flush_task = None
+
+    def forget(self, user_id: int) -> None:
+        """Drops someone's cached account, after deleting it"""
+        self.accounts.pop(user_id, None)
+        self._deltas.pop(user_id, None)
+
+    async def flush(self) -> None:
+        """Writes the pending moves to the ledger and game_data"""
+        async with self._flushing:
+            if not self._pending:
+                return
+            entries, self._pending = self._pending, []
+            deltas, self._deltas = self._deltas, {}
+
+            try:
+                async with GameData.acquire_connection(None) as con:
+                    async with con.transaction():
+                        await CurrencyLedger.insert_many(
+                            [entry._asdict() for entry in entries], connection=con
+                        )
+                        # forget() may have dropped the only users with moves
+                        if deltas:
+                            amounts, wins, losses = map(
+                                list, zip(*deltas.values())
+                            )
+                            await con.execute(
+                                """UPDATE game_data
+                                   SET amount = game_data.amount + moves.amount,
+                                       wins = game_data.wins + moves.wins,
+                                       losses = game_data.losses + moves.losses
+                                   FROM unnest(
+                                       $1::bigint[], $2::int[], $3::int[], $4::int[]
+                                   ) AS moves (user_id, amount, wins, losses)
+                                   WHERE game_data.user_id = moves.user_id""",
+                                list(deltas),
+                                amounts,
+                                wins,
+                                losses,
+                            )
+            except Exception:
+                # merge them back, the next flush will try again
+                self._pending[:0] = entries
+                for user_id, values in deltas.items():
+                    current = self._deltas.setdefault(user_id, [0, 0, 0])
+                    current[:] = [a + b for a, b in zip(current, values)]
+                raise
+            log.debug("Flushed %s ledger entries", len(entries))
+
+    async def house(self, house_id: int) -> Tuple[int, int, int]:
+        """
+        Returns the house's total, wins and losses, out of the ledger
+        and the house's own game_data row, which is no longer written to
+        """
+        await self.flush()
+        async with GameData.acquire_connection(None) as con:
+            record = await con.fetchrow(
+                """SELECT opening.amount + moves.amount AS amount,
+                          opening.wins + moves.wins AS wins,
+                          opening.losses + moves.losses AS losses
+                   FROM (
+                       SELECT -COALESCE(SUM(delta), 0) AS amount,
+                              COUNT(*) FILTER (WHERE delta < 0) AS wins,
+                              COUNT(*) FILTER (WHERE delta > 0) AS losses
+                       FROM currency_ledger
+                       WHERE game <> ALL($1::text[])
+                   ) AS moves
+                   CROSS JOIN (
+                       SELECT COALESCE(SUM(amount), 0) AS amount,
+                              COALESCE(SUM(wins), 0) AS wins,
+                              COALESCE(SUM(losses), 0) AS losses
+                       FROM game_data
+                       WHERE user_id = $2
+                   ) AS opening""",
+                list(GRANTS),
+                house_id,
+            )
+        return record["amount"], record["wins"], record["losses"]
@@ -22,23 +22,145 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-from asyncio import AbstractEventLoop, Task, get_event_loop
-from asyncio import sleep as async_sleep
-from collections.abc import Hashable, MutableMapping
+from asyncio import (
+    AbstractEventLoop,
+    CancelledError,
+    Future,
+    TimerHandle,
+    get_event_loop,
+    shield,
+)
+from collections import OrderedDict
+from collections.abc import Hashable, Mapping, MutableMapping
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+from functools import partial
+from heapq import heapify, heappop, heappush
+from itertools import count
+import json
+from logging import getLogger
+from math import inf
+from sys import getsizeof
 from types import MappingProxyType, SimpleNamespace
-from typing import Any, Iterator, Tuple, Union
-
+from time import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+import zlib
+
+from discord import Embed
 from humanize import naturaldelta
 import numpy as np
 
+if TYPE_CHECKING:
+    from utils.persistence import CacheStore
+
+log = getLogger(__name__)
+
+
+def estimate_size(obj: Any, *, _seen: set = None, _depth: int = 0) -> int:
+    """
+    Roughly estimates how many bytes an object takes,
+    containers and attributes are followed a few levels deep
+    """
+    if _seen is None:
+        _seen = set()
+
+    if id(obj) in _seen or isinstance(obj, type):  # classes are shared
+        return 0
+    _seen.add(id(obj))
+
+    size = getsizeof(obj, 0)
+
+    if _depth >= 6 or isinstance(obj, (str, bytes, bytearray, int, float)):
+        return size
+
+    nested = partial(estimate_size, _seen=_seen, _depth=_depth + 1)
+
+    if isinstance(obj, dict):
+        size += sum(nested(k) + nested(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(map(nested, obj))
+
+    if hasattr(obj, "__dict__"):
+        size += nested(vars(obj))
+
+    for slot in getattr(type(obj), "__slots__", ()):
+        if (attr := getattr(obj, slot, None)) is not None:
+            size += nested(attr)
+
+    return size
+
 
 @dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0  # removed to make room
+    expirations: int = 0  # removed by their timer
+    negative_hits: int = 0  # lookups answered by a cached error
+
+
 class TimedValue:
-    value: Any
-    expires: datetime
-    task: Task
+    """A cache entry, slotted since there can be a lot of them"""
+
+    __slots__ = ("value", "deadline", "size", "stale", "refresh", "error")
+
+    def __init__(
+        self,
+        value: Any,
+        deadline: float,  # loop time at which the value expires
+        size: int = 0,  # estimated size in bytes, only computed when bounded
+        stale: float = inf,  # loop time after which the value gets refreshed
+        refresh: Optional[Callable[[], Awaitable[Any]]] = None,
+        error: Optional[Exception] = None,  # set for negative entries
+    ):
+        self.value = value
+        self.deadline = deadline
+        self.size = size
+        self.stale = stale
+        self.refresh = refresh
+        self.error = error
+
+    def __repr__(self) -> str:
+        name = self.__class__.__name__
+        return f"<{name} value={self.value!r} deadline={self.deadline}>"
+
+
+class PackedEmbed:
+    """
+    An embed kept as it's serialized dict form, one bytes object
+    instead of a tree of dicts and strings, rebuilt on every hit
+    """
+
+    __slots__ = ("cls", "data", "compressed")
+
+    def __init__(self, embed: Embed, *, compress: bool = False):
+        data = json.dumps(embed.to_dict(), separators=(",", ":")).encode()
+        self.cls = type(embed)
+        self.data = zlib.compress(data) if compress else data
+        self.compressed = compress
+
+    def unpack(self) -> Embed:
+        data = zlib.decompress(self.data) if self.compressed else self.data
+        # from_dict keeps references to the dict, so it needs a fresh one
+        return self.cls.from_dict(json.loads(data))
+
+
+def _unpack(value: Any) -> Any:
+    """Rebuilds a value that was packed when stored"""
+    if type(value) is PackedEmbed:
+        return value.unpack()
+    return value
 
 
 class TimedCache(MutableMapping):
@@ -47,6 +169,23 @@ class TimedCache(MutableMapping):
     a certain amount of time after being inserted
 
     The timer is reset / updated if an item is inserted in the same slot
+
+    Expiry is driven by a single min-heap of deadlines and one timer
+    that always points at the earliest one, superseded heap entries are
+    skipped lazily when they come up
+
+    If max_entries or max_bytes are given, the least recently used
+    items are evicted once one of the limits is exceeded
+
+    If a store is given, the values are also written to the disk
+    and read back lazily when fetched after a restart
+
+    Failed fetches can be cached as negative entries for negative_timeout,
+    they raise their error again instead of calling the upstream
+
+    With pack_embeds, embeds are kept serialized (and zlib compressed
+    with compress_embeds) then rebuilt on every hit, trading a bit of
+    cpu for a much smaller footprint
     """
 
     def _make_delays(
@@ -60,15 +199,15 @@ class TimedCache(MutableMapping):
             return delay.total_seconds(), (dt_now + delay)
 
         elif isinstance(delay, datetime):
-            delta = dt_now - delay.replace(tzinfo=timezone.utc)
+            delta = delay.replace(tzinfo=delay.tzinfo or timezone.utc) - dt_now
             return delta.total_seconds(), delay
 
-        elif isinstance(delay, int):
+        elif isinstance(delay, (int, float)):
             final_delay = delay or self.timeout
             return final_delay, (dt_now + timedelta(seconds=final_delay))
 
         elif delay is None:
-            return self.timeout
+            return self.timeout, (dt_now + timedelta(seconds=self.timeout))
 
         else:  # hardcoding ? don't know about what you mean
             raise TypeError(
@@ -79,35 +218,165 @@ class TimedCache(MutableMapping):
         self,
         *,
         timeout: Union[timedelta, datetime, int] = 600,
+        max_entries: int = None,
+        max_bytes: int = None,
+        negative_timeout: Union[timedelta, int] = 60,
+        pack_embeds: bool = False,
+        compress_embeds: bool = False,
+        store: Optional["CacheStore"] = None,
+        name: str = None,
         loop: AbstractEventLoop = None,
     ):
         self.timeout = timeout  # funky way to use the default timeout in the init
         self.timeout, _ = self._make_delays(timeout)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.negative_timeout = negative_timeout
+        self.pack_embeds = pack_embeds or compress_embeds
+        self.compress_embeds = compress_embeds
+        self.store = store  # optional on-disk tier
+        self.name = name
         self.loop = loop or get_event_loop()
-        self.storage = {}
-
-    async def _timed_del(self, key: Hashable, timeout: int) -> None:
-        """Deletes the item and the task associated with it"""
-        self.storage.pop(await async_sleep(timeout or self.timeout, result=key))
-
-    def __setitem__(self, key: Hashable, value: Any, *, timeout: int = None) -> None:
-        if old_val := self.storage.pop(key, None):
-            old_val.task.cancel()
+        self.storage = OrderedDict()  # least recently used first
+        self.stats = CacheStats()
+        self.total_bytes = 0
+        self._deadlines = []  # heap of (deadline, insertion order, key)
+        self._counter = count()
+        self._timer: Optional[TimerHandle] = None
+        self._inflight: Dict[Hashable, Future] = {}
+
+    def _schedule(self, deadline: float) -> None:
+        """Makes sure the reaper wakes up for the given deadline"""
+        if self._timer is not None:
+            if self._timer.when() <= deadline:
+                return
+            self._timer.cancel()
+        self._timer = self.loop.call_at(deadline, self._reap)
+
+    def _reap(self) -> None:
+        """Deletes every expired item then sleeps until the next deadline"""
+        self._timer = None
+        now = self.loop.time()
+        deadlines = self._deadlines
+
+        while deadlines and deadlines[0][0] <= now:
+            deadline, _, key = heappop(deadlines)
+            timed_value = self.storage.get(key)
+            # the key might have been overwritten or deleted since
+            if timed_value is not None and timed_value.deadline == deadline:
+                self._remove(key)
+                self.stats.expirations += 1
+
+        # overwrites leave dead entries behind, don't let them pile up
+        if len(deadlines) > 2 * len(self.storage) + 64:
+            self._deadlines = deadlines = [
+                (v.deadline, next(self._counter), k) for k, v in self.storage.items()
+            ]
+            heapify(deadlines)
+
+        if deadlines:
+            self._schedule(deadlines[0][0])
+
+    def _remove(self, key: Hashable) -> TimedValue:
+        """Removes an item, keeping the size accounting in check"""
+        timed_value = self.storage.pop(key)
+        self.total_bytes -= timed_value.size
+        return timed_value
+
+    def _is_full(self) -> bool:
+        if self.max_entries is not None and len(self.storage) > self.max_entries:
+            return True
+        return self.max_bytes is not None and self.total_bytes > self.max_bytes
+
+    def _evict(self) -> None:
+        """Drops the least recently used items until we fit in the limits"""
+        while self.storage and self._is_full():
+            self._remove(next(iter(self.storage)))
+            self.stats.evictions += 1
+
+    def _get_alive(self, key: Hashable) -> Optional[TimedValue]:
+        """Returns the stored item unless it already expired"""
+        timed_value = self.storage.get(key)
+        if timed_value is not None and timed_value.deadline <= self.loop.time():
+            return None  # the reaper is running late, don't hand out stale data
+        return timed_value
+
+    def _lookup(self, key: Hashable) -> Optional[TimedValue]:
+        """Fetches an item for a caller, counting hits and refreshing its recency"""
+        if (timed_value := self._get_alive(key)) is None:
+            self.stats.misses += 1
+            return None
+
+        if timed_value.error is None:
+            self.stats.hits += 1
+        else:
+            self.stats.negative_hits += 1
+        self.storage.move_to_end(key)
+        return timed_value
+
+    def __setitem__(
+        self,
+        key: Hashable,
+        value: Any,
+        *,
+        timeout: int = None,
+        stale_after: Union[timedelta, int, None] = None,
+        refresh: Callable[[], Awaitable[Any]] = None,
+        error: Exception = None,
+        persist: bool = True,
+    ) -> None:
+        timeout, _ = self._make_delays(timeout)
+        now = self.loop.time()
+        deadline = now + (timeout or self.timeout)
+
+        stale = deadline
+        if stale_after is not None:
+            soft, _ = self._make_delays(stale_after)
+            stale = min(now + soft, deadline)
+
+        if key in self.storage:
+            self._remove(key)
+
+        stored = value
+        if self.pack_embeds and isinstance(value, Embed):
+            stored = PackedEmbed(value, compress=self.compress_embeds)
+
+        size = 0
+        if self.max_bytes is not None:
+            size = estimate_size(key) + estimate_size(stored)
+            if size > self.max_bytes:
+                # it would flush the whole cache and still not fit
+                self.stats.evictions += 1
+                return
+
+        self.storage[key] = TimedValue(
+            value=stored,
+            deadline=deadline,
+            size=size,
+            stale=stale,
+            refresh=refresh,
+            error=error,
+        )
+        self.total_bytes += size
+        self._evict()
 
-        timeout, final_time = self._make_delays(timeout)
-        coro = self._timed_del(key, timeout=timeout)
-        task = self.loop.create_task(coro, name="Timed deletion")
+        heappush(self._deadlines, (deadline, next(self._counter), key))
+        self._schedule(deadline)
 
-        self.storage[key] = TimedValue(value=value, expires=final_time, task=task)
+        if persist and self.store is not None:
+            wall = time() - now  # loop time to unix time
+            self.store.put(self.name, key, value, deadline + wall, stale + wall)
 
     def __delitem__(self, key: Hashable) -> None:
-        self.storage[key].task.cancel()
-        del self.storage[key]
+        self._remove(key)  # the heap entry is skipped once it comes up
+        if self.store is not None:
+            self.store.discard(self.name, key)
 
     def get(self, key: Hashable, default: Any = None) -> Any:
         """ Get a value from TimedCache. """
-        timed_value = self.storage.get(key, default)
-        return getattr(timed_value, "value", default)
+        if (timed_value := self._lookup(key)) is None or timed_value.error:
+            return default
+        return _unpack(timed_value.value)
 
     def set(
         self, key: Hashable, value: Any, timeout: Union[timedelta, datetime, int] = None
@@ -116,21 +385,165 @@ class TimedCache(MutableMapping):
         self.__setitem__(key, value, timeout=timeout)
         return value
 
+    async def fetch(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+        *,
+        timeout: Union[timedelta, datetime, int] = None,
+        stale_after: Union[timedelta, int] = None,
+        negative: Tuple[Type[Exception], ...] = (),
+    ) -> Any:
+        """
+        Returns the cached value, or awaits the factory and caches its result
+
+        Concurrent misses on the same key share a single call to the factory,
+        errors are propagated to every waiter and never cached.
+        If there's a store, it is checked before calling the factory
+
+        With stale_after, values older than that are still returned
+        until the timeout but get refreshed in the background
+
+        The errors listed in negative are cached for negative_timeout
+        """
+        if (timed_value := self._lookup(key)) is not None:
+            if timed_value.error is not None:
+                # the traceback would otherwise grow every time it's raised
+                raise timed_value.error.with_traceback(None)
+            if (
+                timed_value.refresh is not None
+                and timed_value.stale <= self.loop.time()
+                and key not in self._inflight
+            ):
+                self._inflight[key] = future = self.loop.create_future()
+                self.loop.create_task(
+                    self._revalidate(key, future, timed_value.refresh)
+                )
+            return _unpack(timed_value.value)
+
+        if (future := self._inflight.get(key)) is None:
+            # the load gets its own task, so the first caller leaving
+            # doesn't cancel it for everyone else either
+            self._inflight[key] = future = self.loop.create_future()
+            self.loop.create_task(
+                self._settle(
+                    key,
+                    future,
+                    partial(self._load, key, factory, timeout, stale_after, negative),
+                )
+            )
+        return await shield(future)  # a waiter leaving shouldn't cancel the call
+
+    async def _settle(
+        self, key: Hashable, future: Future, load: Callable[[], Awaitable[Any]]
+    ) -> None:
+        """Runs load and hands its outcome to the callers waiting on the future"""
+        try:
+            value = await load()
+        except CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # retrieved, no warning if nobody was waiting
+        else:
+            future.set_result(value)
+        finally:
+            del self._inflight[key]
+
+    async def _revalidate(
+        self, key: Hashable, future: Future, refresh: Callable[[], Awaitable[Any]]
+    ) -> None:
+        """Refreshes a stale value, keeping the old one if it fails"""
+        await self._settle(key, future, refresh)
+        if not future.cancelled() and (error := future.exception()) is not None:
+            log.error(
+                "Could not refresh the cached value for %r", key, exc_info=error
+            )
+
+    async def _load(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+        timeout: Union[timedelta, datetime, int, None],
+        stale_after: Union[timedelta, int, None],
+        negative: Tuple[Type[Exception], ...],
+    ) -> Any:
+        """Reads a missing value back from the store, or calls the factory"""
+        fill = partial(self._fill, key, factory, timeout, stale_after, negative)
+        # only kept when it will be used, it holds on to the factory's arguments
+        refresh = fill if stale_after is not None else None
+
+        if self.store is not None:
+            if (stored := await self.store.get(self.name, key)) is not None:
+                value, expires, stale = stored
+                now = time()
+                self.__setitem__(
+                    key,
+                    value,
+                    timeout=expires - now,
+                    stale_after=stale - now if stale_after is not None else None,
+                    refresh=refresh,
+                    persist=False,
+                )
+                return value
+
+        return await fill()
+
+    async def _fill(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+        timeout: Union[timedelta, datetime, int, None],
+        stale_after: Union[timedelta, int, None],
+        negative: Tuple[Type[Exception], ...],
+    ) -> Any:
+        """Calls the factory and caches its result, or its error if it's listed"""
+        try:
+            value = await factory()
+        except negative as exc:
+            current = self._get_alive(key)
+            # a failed refresh keeps the stale value until it expires
+            if current is None or current.error is not None:
+                self.__setitem__(
+                    key, None, timeout=self.negative_timeout, error=exc, persist=False
+                )
+            raise
+
+        refresh = None
+        if stale_after is not None:
+            refresh = partial(self._fill, key, factory, timeout, stale_after, negative)
+        self.__setitem__(
+            key, value, timeout=timeout, stale_after=stale_after, refresh=refresh
+        )
+        return value
+
     def __getitem__(self, key: Hashable) -> Any:
-        return self.storage[key].value
+        if (timed_value := self._lookup(key)) is None or timed_value.error:
+            raise KeyError(key)
+        return _unpack(timed_value.value)
+
+    def __contains__(self, key: Hashable) -> bool:
+        timed_value = self._get_alive(key)
+        return timed_value is not None and timed_value.error is None
+
+    def _live_keys(self) -> list:
+        """The keys of the values still valid, expired and negative ones left out"""
+        now = self.loop.time()
+        return [k for k, v in self.storage.items() if v.deadline > now and not v.error]
 
     def __iter__(self) -> iter:
-        return iter(self.storage)
+        return iter(self._live_keys())
 
     def __len__(self) -> int:
-        return len(self.storage)
+        return len(self._live_keys())
 
     def _clean_data(self) -> Iterator[Tuple[Hashable, Tuple[Any, str]]]:
-        dt_now = datetime.now(tz=timezone.utc)
+        now = self.loop.time()
         for key, timedvalue in self.storage.items():
             yield key, (
-                timedvalue.value,
-                f"Expires in {naturaldelta(dt_now - timedvalue.expires)}",
+                _unpack(timedvalue.value),
+                f"Expires in {naturaldelta(timedvalue.deadline - now)}",
             )
 
     def __repr__(self) -> repr:
@@ -146,8 +559,55 @@ class TimedCache(MutableMapping):
         return bool(self.storage)
 
     def __del__(self):
-        for key in self.storage.keys():
-            del self.storage[key]
+        if self._timer is not None:
+            self._timer.cancel()
+
+
+class CacheRegions(Mapping):
+    """
+    Hands out named TimedCaches so each cog gets its own
+    timeout, size limits and stats
+
+    Regions are created on first use, using their policy if there's one
+    and the default options otherwise, regions with `persistent` set
+    in their policy also use the store
+    """
+
+    def __init__(
+        self,
+        *,
+        policies: Dict[str, Dict[str, Any]] = None,
+        store: Optional["CacheStore"] = None,
+        loop: AbstractEventLoop = None,
+        **defaults,
+    ):
+        self.policies = policies or {}
+        self.store = store
+        self.defaults = defaults
+        self.loop = loop or get_event_loop()
+        self.regions: Dict[str, TimedCache] = {}
+
+    def region(self, name: str) -> TimedCache:
+        """Returns the cache tied to that name, creating it if needed"""
+        if (cache := self.regions.get(name)) is None:
+            options = {**self.defaults, **self.policies.get(name, {})}
+            store = self.store if options.pop("persistent", False) else None
+            cache = self.regions[name] = TimedCache(
+                store=store, name=name, loop=self.loop, **options
+            )
+        return cache
+
+    def __getitem__(self, name: str) -> TimedCache:
+        return self.regions[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.regions)
+
+    def __len__(self) -> int:
+        return len(self.regions)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} regions={list(self.regions)}>"
 
 
 class NestedNamespace(SimpleNamespace):  # Thanks, cy
@@ -34,16 +34,23 @@ DEALINGS IN THE SOFTWARE.
 import asyncio
 import datetime
 import decimal
+import hashlib
 import inspect
 import json
 import logging
 import pydoc
 import uuid
+from array import array
 from collections import OrderedDict
+from collections.abc import Sequence
 from pathlib import Path
+from time import perf_counter
+from typing import NamedTuple, Optional
 
 import asyncpg
 
+from utils.querystats import InstrumentedPool, QueryStats
+
 log = logging.getLogger(__name__)
 
 
@@ -514,6 +521,102 @@ class SchemaDiff:
         return "\n".join(statements)
 
 
+# asyncpg runs these through execute itself, for every transaction
+_TRANSACTION_CONTROL = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE SAVEPOINT")
+
+
+class Connection(asyncpg.Connection):
+    """A connection that keeps the statements generated by the tables prepared.
+
+    When ``query_stats`` is set every statement it runs is timed into it,
+    apart from the ones asyncpg sends on its own to manage the connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = {}
+        self.query_stats = None
+
+    def _is_housekeeping(self, query):
+        # the reset query runs on every release, it would top the stats
+        return query.startswith(_TRANSACTION_CONTROL) or query == self.get_reset_query()
+
+    async def execute(self, query, *args, timeout=None):
+        if self.query_stats is None or self._is_housekeeping(query):
+            return await super().execute(query, *args, timeout=timeout)
+        with self.query_stats.timed(query):
+            return await super().execute(query, *args, timeout=timeout)
+
+    async def executemany(self, command, args, *, timeout=None):
+        if self.query_stats is None:
+            return await super().executemany(command, args, timeout=timeout)
+        with self.query_stats.timed(command):
+            return await super().executemany(command, args, timeout=timeout)
+
+    async def fetch(self, query, *args, timeout=None, **kwargs):
+        if self.query_stats is None:
+            return await super().fetch(query, *args, timeout=timeout, **kwargs)
+        with self.query_stats.timed(query):
+            return await super().fetch(query, *args, timeout=timeout, **kwargs)
+
+    async def fetchrow(self, query, *args, timeout=None, **kwargs):
+        if self.query_stats is None:
+            return await super().fetchrow(query, *args, timeout=timeout, **kwargs)
+        with self.query_stats.timed(query):
+            return await super().fetchrow(query, *args, timeout=timeout, **kwargs)
+
+    async def fetchval(self, query, *args, column=0, timeout=None):
+        if self.query_stats is None:
+            return await super().fetchval(query, *args, column=column, timeout=timeout)
+        with self.query_stats.timed(query):
+            return await super().fetchval(query, *args, column=column, timeout=timeout)
+
+    async def copy_records_to_table(self, table_name, **kwargs):
+        if self.query_stats is None:
+            return await super().copy_records_to_table(table_name, **kwargs)
+        with self.query_stats.timed(f"COPY {table_name}"):
+            return await super().copy_records_to_table(table_name, **kwargs)
+
+    async def statement(self, query):
+        """Returns the prepared statement for that query, preparing it once."""
+        try:
+            return self.prepared[query]
+        except KeyError:
+            stmt = self.prepared[query] = await self.prepare(query)
+            return stmt
+
+
+def _check_value(column, value):
+    """Raises a TypeError if the value can't go in that column."""
+    check = column.column_type.python
+    if value is None:
+        if not column.nullable:
+            raise TypeError("Cannot pass None to non-nullable column %s." % column.name)
+    elif not check or not isinstance(value, check):
+        fmt = "column {0.name} expected {1.__name__}, received {2.__class__.__name__}"
+        raise TypeError(fmt.format(column, check, value))
+
+
+async def _run_prepared(con, query, args, method):
+    """Runs a generated query through the connection's prepared statements."""
+    if not hasattr(con, "statement"):
+        # not one of ours, asyncpg's own statement cache will do
+        return await getattr(con, method)(query, *args)
+
+    stats = con.query_stats
+    try:
+        stmt = await con.statement(query)
+        if stats is None:
+            return await getattr(stmt, method)(*args)
+        with stats.timed(query):
+            return await getattr(stmt, method)(*args)
+    except asyncpg.InvalidCachedStatementError:
+        # the table changed under the statement, prepare it again
+        con.prepared.pop(query, None)
+        stmt = await con.statement(query)
+        return await getattr(stmt, method)(*args)
+
+
 class MaybeAcquire:
     def __init__(self, connection, *, pool):
         self.connection = connection
@@ -532,6 +635,124 @@ class MaybeAcquire:
             await self.pool.release(self._connection)
 
 
+class RowArray(Sequence):
+    """A column oriented batch of rows, for large result sets.
+
+    Each column is kept as a single list, or as an :class:`array.array`
+    for numeric columns without NULLs. Rows are only built when indexed.
+    """
+
+    __slots__ = ("row_class", "columns", "_length")
+
+    def __init__(self, row_class, records):
+        records = records if isinstance(records, list) else list(records)
+        self.row_class = row_class
+        self._length = len(records)
+        self.columns = {}
+        for name in row_class.__slots__:
+            values = [record.get(name) for record in records]
+            if (typecode := row_class._typecodes.get(name)) is not None:
+                try:
+                    values = array(typecode, values)
+                except (TypeError, OverflowError):
+                    pass  # there's a NULL, or it doesn't fit, keep the list
+            self.columns[name] = values
+
+    def column(self, name):
+        """Returns every value of a column."""
+        return self.columns[name]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        row = self.row_class.__new__(self.row_class)
+        for name, values in self.columns.items():
+            setattr(row, name, values[index])
+        return row
+
+    def __len__(self):
+        return self._length
+
+    def __repr__(self):
+        return "<RowArray of %s, %s rows>" % (self.row_class.__name__, self._length)
+
+
+class Row:
+    """The base of the row classes generated for every table.
+
+    Rows are slotted records with one attribute per column, they can
+    still be indexed by column name like the records they come from.
+    """
+
+    __slots__ = ()
+    _typecodes = {}
+
+    @classmethod
+    def bulk(cls, records):
+        """Builds a :class:`RowArray` out of many records."""
+        return RowArray(cls, records)
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self):
+        fields = " ".join(
+            "%s=%r" % (name, getattr(self, name, None)) for name in self.__slots__
+        )
+        return "<%s %s>" % (self.__class__.__name__, fields)
+
+
+def _typecode(column_type):
+    """The array typecode a column can be stored in, if there's one."""
+    if isinstance(column_type, Integer):
+        return "q" if column_type.big else "h" if column_type.small else "i"
+    if isinstance(column_type, (Float, Double)):
+        return "d"
+    return None
+
+
+def _make_row_class(name, columns):
+    """Generates the slotted row class of a table from its columns."""
+    names = [column.name for column in columns]
+    for column_name in names:
+        if not column_name.isidentifier():
+            raise SchemaError("%r can't be used as a row attribute." % column_name)
+
+    # one assignment per column, no loop to run on every row
+    lines = [
+        "def from_record(cls, record):",
+        "    self = new(cls)",
+        "    get = record.get",
+    ]
+    lines.extend("    self.%s = get(%r)" % (n, n) for n in names)
+    lines.append("    return self")
+    namespace = {"new": object.__new__}
+    exec("\n".join(lines), namespace)
+
+    return type(
+        name + "Row",
+        (Row,),
+        {
+            "__slots__": tuple(names),
+            "__module__": Row.__module__,
+            "_typecodes": {
+                column.name: typecode
+                for column in columns
+                if (typecode := _typecode(column.column_type)) is not None
+            },
+            "from_record": classmethod(namespace["from_record"]),
+        },
+    )
+
+
 class TableMeta(type):
     @classmethod
     def __prepare__(cls, name, bases, **kwargs):
@@ -558,6 +779,23 @@ class TableMeta(type):
                 columns.append(value)
 
         dct["columns"] = columns
+        dct["Row"] = _make_row_class(name, columns)
+
+        # the helpers' statements, the ones that depend on which columns
+        # are passed are generated the first time they're needed
+        primary_keys = [column.name for column in columns if column.primary_key]
+        where = " AND ".join(
+            "%s = $%s" % (key, i) for i, key in enumerate(primary_keys, 1)
+        )
+        dct["_primary_keys"] = primary_keys
+        dct["_queries"] = {}
+        if primary_keys:
+            dct["_queries"]["get"] = "SELECT * FROM %s WHERE %s;" % (table_name, where)
+            dct["_queries"]["delete"] = "DELETE FROM %s WHERE %s RETURNING *;" % (
+                table_name,
+                where,
+            )
+
         return super().__new__(cls, name, parents, dct)
 
     def __init__(self, name, parents, dct, **kwargs):
@@ -566,7 +804,7 @@ class TableMeta(type):
 
 class Table(metaclass=TableMeta):
     @classmethod
-    async def create_pool(cls, uri, **kwargs):
+    async def create_pool(cls, uri, *, slow_query_threshold=0.5, **kwargs):
         """Sets up and returns the PostgreSQL connection pool that is used.
 
         .. note::
@@ -578,6 +816,9 @@ class Table(metaclass=TableMeta):
         -----------
         uri: str
             The PostgreSQL URI to connect to.
+        slow_query_threshold: Optional[float]
+            How many seconds a statement can take before it gets
+            written to the slow query log, ``None`` to never log.
         \*\*kwargs
             The arguments to forward to asyncpg.create_pool.
         """
@@ -589,6 +830,8 @@ class Table(metaclass=TableMeta):
             return json.loads(value)
 
         old_init = kwargs.pop("init", None)
+        kwargs.setdefault("connection_class", Connection)
+        stats = QueryStats(slow_threshold=slow_query_threshold)
 
         async def init(con):
             await con.set_type_codec(
@@ -598,10 +841,20 @@ class Table(metaclass=TableMeta):
                 decoder=_decode_jsonb,
                 format="text",
             )
+            if isinstance(con, Connection):
+                con.query_stats = stats
+                # the lookups are the hot ones, get them ready up front
+                for table in cls.all_tables():
+                    for query in table._queries.values():
+                        try:
+                            await con.statement(query)
+                        except asyncpg.UndefinedTableError:
+                            break  # not created yet, prepared on first use
             if old_init is not None:
                 await old_init(con)
 
-        cls._pool = pool = await asyncpg.create_pool(uri, init=init, **kwargs)
+        pool = await asyncpg.create_pool(uri, init=init, **kwargs)
+        cls._pool = pool = InstrumentedPool(pool, stats)
         return pool
 
     @classmethod
@@ -721,6 +974,9 @@ class Table(metaclass=TableMeta):
         with current.open("w", encoding="utf-8") as fp:
             json.dump(cls.to_dict(), fp, indent=4, ensure_ascii=True)
 
+        # the file no longer has to match the class, diff it next time
+        current.with_suffix(".sha256").unlink(missing_ok=True)
+
     @classmethod
     async def create(
         cls,
@@ -756,6 +1012,8 @@ class Table(metaclass=TableMeta):
         current = directory.with_name("current-" + p.name)
 
         table_data = cls.to_dict()
+        checksum_file = current.with_suffix(".sha256")
+        checksum = cls.checksum(table_data)
 
         if not p.exists():
             p.parent.mkdir(parents=True, exist_ok=True)
@@ -768,6 +1026,9 @@ class Table(metaclass=TableMeta):
                 if verbose:
                     print(sql)
                 await con.execute(sql)
+                # tables made by hand before this may lack the key
+                # the generated upserts need for their ON CONFLICT
+                await cls.add_missing_primary_key(connection=con, verbose=verbose)
 
             # since that step passed, let's go ahead and make the migration
             with p.open("w", encoding="utf-8") as fp:
@@ -777,18 +1038,23 @@ class Table(metaclass=TableMeta):
             with current.open("w", encoding="utf-8") as fp:
                 json.dump(table_data, fp, indent=4, ensure_ascii=True)
 
+            checksum_file.write_text(checksum)
             return True
 
         if not run_migrations:
             return None
 
+        # the most common case, nothing changed since the last run
+        if checksum_file.exists() and checksum_file.read_text() == checksum:
+            return None
+
         with current.open() as fp:
             current_table = cls.from_dict(json.load(fp))
 
         diff = cls().diff(current_table)
 
-        # the most common case, no difference
         if diff.is_empty():
+            checksum_file.write_text(checksum)
             return None
 
         # execute the upgrade SQL
@@ -818,8 +1084,72 @@ class Table(metaclass=TableMeta):
         with current.open("w", encoding="utf-8") as fp:
             json.dump(table_data, fp, indent=4, ensure_ascii=True)
 
+        checksum_file.write_text(checksum)
         return False
 
+    @classmethod
+    async def add_missing_primary_key(
+        cls, *, connection=None, verbose=False, clean=False
+    ):
+        """Adds the primary key to an existing table that doesn't have one.
+
+        Rows with a NULL key or a duplicated key would stop the key from
+        being added. A SchemaError saying how many there are is raised,
+        unless ``clean`` is passed, then the rows with a NULL key are
+        deleted and an arbitrary one is kept for each duplicated key.
+
+        Returns
+        --------
+        bool
+            ``True`` if the key had to be added.
+        """
+        keys = cls._primary_keys
+        if not keys:
+            return False
+
+        query = """SELECT 1 FROM pg_constraint
+                   WHERE conrelid = $1::regclass AND contype = 'p';"""
+        async with MaybeAcquire(connection, pool=cls._pool) as con:
+            if await con.fetchval(query, cls.__tablename__):
+                return False
+
+            nulls = " OR ".join("%s IS NULL" % key for key in keys)
+            query = (
+                "SELECT count(*) FILTER (WHERE {1}) AS nulls,"
+                " count(*) FILTER (WHERE NOT ({1}))"
+                " - count(DISTINCT ROW({2})) FILTER (WHERE NOT ({1})) AS duplicates"
+                " FROM {0};"
+            ).format(cls.__tablename__, nulls, ", ".join(keys))
+            record = await con.fetchrow(query)
+            if (record["nulls"] or record["duplicates"]) and not clean:
+                raise SchemaError(
+                    "Cannot add the primary key to %s, %s rows have a NULL key"
+                    " and %s more share one. Clean them up or pass clean=True."
+                    % (cls.__tablename__, record["nulls"], record["duplicates"])
+                )
+
+            sql = (
+                "DELETE FROM {0} WHERE {1};\n"
+                "DELETE FROM {0} a USING {0} b WHERE a.ctid < b.ctid AND {2};\n"
+                "ALTER TABLE {0} ADD PRIMARY KEY ({3});"
+            ).format(
+                cls.__tablename__,
+                nulls,
+                " AND ".join("a.{0} = b.{0}".format(key) for key in keys),
+                ", ".join(keys),
+            )
+            if verbose:
+                print(sql)
+            async with con.transaction():
+                await con.execute(sql)
+        return True
+
+    @staticmethod
+    def checksum(table_data):
+        """Hashes the output of :meth:`to_dict` to tell if the schema changed."""
+        dumped = json.dumps(table_data, sort_keys=True, ensure_ascii=True)
+        return hashlib.sha256(dumped.encode()).hexdigest()
+
     @classmethod
     async def drop(cls, *, directory="migrations", verbose=False, connection=None):
         """Drops the database and migrations, if any.
@@ -852,6 +1182,8 @@ class Table(metaclass=TableMeta):
         except:
             raise RuntimeError("Could not delete current migration file")
 
+        current.with_suffix(".sha256").unlink(missing_ok=True)
+
         async with MaybeAcquire(connection, pool=cls._pool) as con:
             sql = "DROP TABLE {0} CASCADE;".format(cls.__tablename__)
             if verbose:
@@ -901,15 +1233,7 @@ class Table(metaclass=TableMeta):
             except KeyError:
                 continue
 
-            check = column.column_type.python
-            if value is None and not column.nullable:
-                raise TypeError(
-                    "Cannot pass None to non-nullable column %s." % column.name
-                )
-            elif not check or not isinstance(value, check):
-                fmt = "column {0.name} expected {1.__name__}, received {2.__class__.__name__}"
-                raise TypeError(fmt.format(column, check, value))
-
+            _check_value(column, value)
             verified[column.name] = value
 
         sql = "INSERT INTO {0} ({1}) VALUES ({2});".format(
@@ -921,6 +1245,238 @@ class Table(metaclass=TableMeta):
         async with MaybeAcquire(connection, pool=cls._pool) as con:
             await con.execute(sql, *verified.values())
 
+    @classmethod
+    async def insert_many(cls, rows, connection=None):
+        """Inserts several elements to the table at once.
+
+        Every row must have the same keys. They are validated column by
+        column, then streamed with COPY. If COPY isn't possible, a prepared
+        INSERT is run once per row with ``executemany`` instead.
+
+        Parameters
+        -----------
+        rows: Iterable[Mapping[str, Any]]
+            The rows to insert, as they would be passed to :meth:`insert`.
+        connection: Optional[asyncpg.Connection]
+            The connection to use, if not provided will acquire one from
+            the internal pool.
+
+        Returns
+        --------
+        int
+            The number of rows inserted.
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+
+        names = set(rows[0])
+        columns = [column for column in cls.columns if column.name in names]
+        if len(columns) != len(names):
+            unknown = names.difference(column.name for column in columns)
+            raise TypeError("unknown columns %s." % ", ".join(sorted(unknown)))
+
+        try:
+            values = [[row[column.name] for row in rows] for column in columns]
+        except KeyError as exc:
+            raise TypeError("every row must have the same columns, missing %s." % exc)
+        if any(len(row) != len(names) for row in rows):
+            raise TypeError("every row must have the same columns.")
+
+        for column, column_values in zip(columns, values):
+            for value in column_values:
+                _check_value(column, value)
+
+        records = list(zip(*values))
+        names = [column.name for column in columns]
+
+        async with MaybeAcquire(connection, pool=cls._pool) as con:
+            # the jsonb codec is text only, binary COPY can't use it
+            if not any(isinstance(c.column_type, JSON) for c in columns):
+                try:
+                    # a savepoint if we're already in a transaction,
+                    # so a failed COPY doesn't abort it
+                    async with con.transaction():
+                        await con.copy_records_to_table(
+                            cls.__tablename__, records=records, columns=names
+                        )
+                    return len(records)
+                except (asyncpg.InterfaceError, asyncpg.FeatureNotSupportedError):
+                    log.info("COPY into %s failed, using INSERT", cls.__tablename__)
+
+            sql = "INSERT INTO {0} ({1}) VALUES ({2});".format(
+                cls.__tablename__,
+                ", ".join(names),
+                ", ".join("$" + str(i) for i, _ in enumerate(names, 1)),
+            )
+            await con.executemany(sql, records)
+            return len(records)
+
+    @classmethod
+    def _verify(cls, values):
+        """Checks the values against the columns, in the columns' order."""
+        verified = {}
+        for column in cls.columns:
+            try:
+                value = values[column.name]
+            except KeyError:
+                continue
+
+            _check_value(column, value)
+            verified[column.name] = value
+
+        if len(verified) != len(values):
+            unknown = set(values).difference(verified)
+            raise TypeError("unknown columns %s." % ", ".join(sorted(unknown)))
+
+        return verified
+
+    @classmethod
+    def _split_keys(cls, values):
+        """Separates the primary keys from the other columns."""
+        if not cls._primary_keys:
+            raise SchemaError("%s has no primary key." % cls.__tablename__)
+
+        verified = cls._verify(values)
+        try:
+            keys = [verified.pop(key) for key in cls._primary_keys]
+        except KeyError as exc:
+            raise TypeError("missing primary key %s." % exc) from None
+        return keys, verified
+
+    @classmethod
+    def _query(cls, kind, columns, build):
+        """Returns the query of that kind for those columns, building it once."""
+        try:
+            return cls._queries[kind, columns]
+        except KeyError:
+            query = cls._queries[kind, columns] = build()
+            return query
+
+    @classmethod
+    def _to_row(cls, record):
+        return cls.Row.from_record(record) if record is not None else None
+
+    @classmethod
+    async def get(cls, connection=None, **keys):
+        """Fetches a row by its primary keys.
+
+        Returns
+        --------
+        Optional[Row]
+            The row, if there's one.
+        """
+        keys, _ = cls._split_keys(keys)
+        async with MaybeAcquire(connection, pool=cls._pool) as con:
+            record = await _run_prepared(con, cls._queries["get"], keys, "fetchrow")
+        return cls._to_row(record)
+
+    @classmethod
+    async def delete(cls, connection=None, **keys):
+        """Deletes a row by its primary keys.
+
+        Returns
+        --------
+        Optional[Row]
+            The deleted row, if there was one.
+        """
+        keys, _ = cls._split_keys(keys)
+        async with MaybeAcquire(connection, pool=cls._pool) as con:
+            record = await _run_prepared(
+                con, cls._queries["delete"], keys, "fetchrow"
+            )
+        return cls._to_row(record)
+
+    @classmethod
+    async def upsert(cls, connection=None, *, overwrite=True, **values):
+        """Inserts a row, or updates the given columns if it already exists.
+
+        Parameters
+        -----------
+        overwrite: bool
+            Whether an existing row gets updated, if ``False`` it's left as is.
+
+        Returns
+        --------
+        Optional[Row]
+            The inserted or updated row, ``None`` if it was left as is.
+        """
+        keys, verified = cls._split_keys(values)
+        names = (*cls._primary_keys, *verified)
+
+        def build():
+            if overwrite and verified:
+                action = "UPDATE SET " + ", ".join(
+                    "{0} = EXCLUDED.{0}".format(name) for name in verified
+                )
+            else:
+                action = "NOTHING"
+            fmt = "INSERT INTO {0} ({1}) VALUES ({2}) ON CONFLICT ({3}) DO {4} RETURNING *;"
+            return fmt.format(
+                cls.__tablename__,
+                ", ".join(names),
+                ", ".join("$" + str(i) for i, _ in enumerate(names, 1)),
+                ", ".join(cls._primary_keys),
+                action,
+            )
+
+        query = cls._query(("upsert", overwrite), names, build)
+        async with MaybeAcquire(connection, pool=cls._pool) as con:
+            record = await _run_prepared(
+                con, query, [*keys, *verified.values()], "fetchrow"
+            )
+        return cls._to_row(record)
+
+    @classmethod
+    async def update(cls, connection=None, **values):
+        """Sets the given columns of a row, found by its primary keys.
+
+        Returns
+        --------
+        Optional[Row]
+            The updated row, if there was one.
+        """
+        return await cls._update("update", "{0} = ${1}", connection, values)
+
+    @classmethod
+    async def increment(cls, connection=None, **values):
+        """Adds to the given columns of a row, found by its primary keys.
+
+        Negative amounts decrement them, ``increment(user_id=1, wins=1)``.
+
+        Returns
+        --------
+        Optional[Row]
+            The updated row, if there was one.
+        """
+        return await cls._update("increment", "{0} = {0} + ${1}", connection, values)
+
+    @classmethod
+    async def _update(cls, kind, fmt, connection, values):
+        keys, verified = cls._split_keys(values)
+        if not verified:
+            raise TypeError("nothing to %s." % kind)
+
+        def build():
+            offset = len(keys) + 1
+            return "UPDATE {0} SET {1} WHERE {2} RETURNING *;".format(
+                cls.__tablename__,
+                ", ".join(
+                    fmt.format(name, i) for i, name in enumerate(verified, offset)
+                ),
+                " AND ".join(
+                    "{0} = ${1}".format(key, i)
+                    for i, key in enumerate(cls._primary_keys, 1)
+                ),
+            )
+
+        query = cls._query(kind, tuple(verified), build)
+        async with MaybeAcquire(connection, pool=cls._pool) as con:
+            record = await _run_prepared(
+                con, query, [*keys, *verified.values()], "fetchrow"
+            )
+        return cls._to_row(record)
+
     @classmethod
     def to_dict(cls):
         x = {}
@@ -1132,16 +1688,64 @@ class Table(metaclass=TableMeta):
         return SchemaDiff(self, upgrade, downgrade)
 
 
-async def _table_creator(tables, *, verbose=True):
-    for table in tables:
-        try:
-            await table.create(verbose=verbose)
-        except:
-            log.error("Failed to create table %s.", table.__tablename__)
+class TableTiming(NamedTuple):
+    table: str
+    result: Optional[bool]  # what Table.create returned
+    elapsed: float
+    failed: bool = False
 
 
-def create_tables(*tables, verbose=True, loop=None):
+async def _table_creator(tables, *, verbose=True, concurrency=4):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def create(table):
+        async with semaphore:
+            start = perf_counter()
+            try:
+                result = await table.create(verbose=verbose)
+            except Exception:
+                log.exception("Failed to create table %s.", table.__tablename__)
+                return TableTiming(
+                    table.__tablename__, None, perf_counter() - start, True
+                )
+            return TableTiming(table.__tablename__, result, perf_counter() - start)
+
+    start = perf_counter()
+    timings = await asyncio.gather(*map(create, tables))
+    elapsed = perf_counter() - start
+
+    outcomes = {"created": 0, "migrated": 0, "unchanged": 0, "failed": 0}
+    for timing in timings:
+        if timing.failed:
+            outcomes["failed"] += 1
+        elif timing.result is None:
+            outcomes["unchanged"] += 1
+        else:
+            outcomes["created" if timing.result else "migrated"] += 1
+
+    slowest = max(timings, key=lambda t: t.elapsed, default=None)
+    # printed like the rest of startup, no logging handler is set up for INFO
+    print(
+        f"Set up {len(timings)} tables in {elapsed * 1000:.1f}ms ("
+        + ", ".join(f"{amount} {outcome}" for outcome, amount in outcomes.items())
+        + ")"
+        + (
+            f", slowest {slowest.table} at {slowest.elapsed * 1000:.1f}ms"
+            if slowest
+            else ""
+        )
+    )
+    return timings
+
+
+def create_tables(*tables, verbose=True, loop=None, concurrency=4):
+    """Creates or migrates the tables, at most ``concurrency`` at a time.
+
+    Returns the task, it resolves to a :class:`TableTiming` per table.
+    """
     if loop is None:
         loop = asyncio.get_event_loop()
 
-    loop.create_task(_table_creator(tables, verbose=verbose))
+    return loop.create_task(
+        _table_creator(tables, verbose=verbose, concurrency=concurrency)
+    )
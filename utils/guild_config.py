@@ -0,0 +1,267 @@
+"""
+MIT License
+
+Copyright (c) 2021 - µYert
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import json
+import re
+from asyncio import AbstractEventLoop, Task, get_event_loop, sleep
+from logging import getLogger
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import asyncpg
+from discord.backoff import ExponentialBackoff
+
+log = getLogger(__name__)
+
+CHANNEL = "guild_config"
+
+# every change to guild_config is broadcast so the other processes
+# can update their mirror without polling
+NOTIFY_TRIGGER = """
+CREATE OR REPLACE FUNCTION notify_guild_config() RETURNS trigger AS $$
+DECLARE
+    row guild_config;
+BEGIN
+    row := CASE WHEN TG_OP = 'DELETE' THEN OLD ELSE NEW END;
+    PERFORM pg_notify(
+        'guild_config',
+        json_build_object(
+            'op', TG_OP,
+            'guild_id', row.guild_id,
+            'prefixes', row.prefixes,
+            'stats_enabled', row.stats_enabled
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS guild_config_notify ON guild_config;
+CREATE TRIGGER guild_config_notify
+AFTER INSERT OR UPDATE OR DELETE ON guild_config
+FOR EACH ROW EXECUTE PROCEDURE notify_guild_config();
+"""
+
+
+class PrefixMatcher:
+    """
+    Finds which of a guild's prefixes a message starts with in one pass,
+    the alternation is ordered longest first so `!!` wins over `!`
+    """
+
+    __slots__ = ("prefixes", "_match")
+
+    def __init__(self, prefixes: Tuple[str, ...]):
+        self.prefixes = prefixes
+        ordered = sorted(prefixes, key=len, reverse=True)
+        self._match = re.compile("|".join(map(re.escape, ordered))).match
+
+    def match(self, content: str) -> Optional[str]:
+        """Returns the prefix the content starts with, if any"""
+        if not content.startswith(self.prefixes):  # most messages bail out here
+            return None
+        return self._match(content).group()
+
+
+class GuildSettings(NamedTuple):
+    prefixes: Tuple[str, ...]
+    stats_enabled: bool = False
+
+
+class GuildConfig:
+    """
+    An in-memory mirror of the guild_config table
+
+    The whole table is loaded in one query at startup, reads never
+    touch the database. Writes go to the mirror first then to the
+    database, and the changes made by other processes are picked up
+    through LISTEN / NOTIFY, on a connection of its own made from dsn
+    rather than one held out of the pool for good
+    """
+
+    def __init__(
+        self,
+        pool: Optional[asyncpg.pool.Pool],
+        *,
+        default_prefix: str,
+        dsn: Optional[str] = None,
+        loop: AbstractEventLoop = None,
+    ):
+        self.pool = pool
+        self.dsn = dsn
+        self.loop = loop or get_event_loop()
+        self.default = GuildSettings(prefixes=(default_prefix,))
+        self.guilds: Dict[int, GuildSettings] = {}
+        self._matchers: Dict[int, PrefixMatcher] = {}
+        self._listener: Optional[asyncpg.Connection] = None
+        self._reconnect_task: Optional[Task] = None
+        self._backlog: Optional[List[str]] = None  # notifications during a load
+        # called with the guild id a notification changed, None after a reload
+        self.change_listeners: List[Callable[[Optional[int]], None]] = []
+
+    async def start(self) -> None:
+        """Loads the table and starts listening for changes"""
+        if self.pool is None or self.dsn is None:
+            return
+
+        # listen first so that nothing changed during the load is missed,
+        # what arrives meanwhile is held back and applied on top of it
+        con = await asyncpg.connect(self.dsn)
+        self._backlog = []
+        try:
+            await con.execute(NOTIFY_TRIGGER)
+            await con.add_listener(CHANNEL, self._on_notify)
+            records = await con.fetch(
+                "SELECT guild_id, prefixes, stats_enabled FROM guild_config"
+            )
+        except BaseException:
+            self._backlog = None
+            con.terminate()
+            raise
+        con.add_termination_listener(self._on_terminate)
+        self._listener = con
+
+        self.guilds = {
+            record["guild_id"]: self._settings(
+                record["prefixes"], record["stats_enabled"]
+            )
+            for record in records
+        }
+
+        backlog, self._backlog = self._backlog, None
+        for payload in backlog:
+            self._apply(payload)
+        self._changed(None)
+        log.info("Loaded the config of %s guilds", len(self.guilds))
+
+    async def close(self) -> None:
+        if (task := self._reconnect_task) is not None:
+            self._reconnect_task = None
+            task.cancel()
+        if (con := self._listener) is not None:
+            self._listener = None
+            con.remove_termination_listener(self._on_terminate)
+            await con.close()
+
+    def _settings(
+        self, prefixes: Optional[Iterable[str]], stats_enabled: Optional[bool]
+    ) -> GuildSettings:
+        return GuildSettings(
+            prefixes=tuple(prefixes or self.default.prefixes),
+            stats_enabled=bool(stats_enabled),
+        )
+
+    def _on_notify(self, con, pid: int, channel: str, payload: str) -> None:
+        if self._backlog is not None:
+            self._backlog.append(payload)
+        else:
+            self._apply(payload)
+
+    def _apply(self, payload: str) -> None:
+        data = json.loads(payload)
+        if data["op"] == "DELETE":
+            self.guilds.pop(data["guild_id"], None)
+        else:
+            self.guilds[data["guild_id"]] = self._settings(
+                data["prefixes"], data["stats_enabled"]
+            )
+        self._changed(data["guild_id"])
+
+    def _changed(self, guild_id: Optional[int]) -> None:
+        for listener in self.change_listeners:
+            try:
+                listener(guild_id)
+            except Exception:
+                log.exception("Guild config listener %r failed", listener)
+
+    def _on_terminate(self, con) -> None:
+        """The notifications sent while we're gone are lost, so reload everything"""
+        log.warning("Lost the guild_config listener, reloading the mirror")
+        self._listener = None
+        con.terminate()
+        if self._reconnect_task is None:
+            self._reconnect_task = self.loop.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        """Reloads the mirror until it works, waiting longer after every failure"""
+        backoff = ExponentialBackoff()
+        try:
+            while True:
+                try:
+                    await self.start()
+                except Exception:
+                    delay = backoff.delay()
+                    log.exception(
+                        "Could not reload the guild config, retrying in %.0fs", delay
+                    )
+                    await sleep(delay)
+                else:
+                    return
+        finally:
+            self._reconnect_task = None
+
+    def get(self, guild_id: int) -> GuildSettings:
+        return self.guilds.get(guild_id, self.default)
+
+    def prefixes(self, guild_id: int) -> Tuple[str, ...]:
+        return self.get(guild_id).prefixes
+
+    def matcher(self, guild_id: int) -> PrefixMatcher:
+        """Returns the guild's prefix matcher, compiled again only if they changed"""
+        prefixes = self.get(guild_id).prefixes
+        matcher = self._matchers.get(guild_id)
+        if matcher is None or matcher.prefixes is not prefixes:
+            matcher = self._matchers[guild_id] = PrefixMatcher(prefixes)
+        return matcher
+
+    def stats_enabled(self, guild_id: int) -> bool:
+        return self.get(guild_id).stats_enabled
+
+    async def set_prefixes(self, guild_id: int, prefixes: Iterable[str]) -> None:
+        self.guilds[guild_id] = settings = self.get(guild_id)._replace(
+            prefixes=tuple(prefixes)
+        )
+        if self.pool is not None:
+            await self.pool.execute(
+                """INSERT INTO guild_config (guild_id, prefixes)
+                   VALUES ($1, $2)
+                   ON CONFLICT (guild_id)
+                   DO UPDATE SET prefixes = $2;""",
+                guild_id,
+                list(settings.prefixes),
+            )
+
+    async def set_stats_enabled(self, guild_id: int, enabled: bool) -> None:
+        self.guilds[guild_id] = settings = self.get(guild_id)._replace(
+            stats_enabled=enabled
+        )
+        if self.pool is not None:
+            await self.pool.execute(
+                """INSERT INTO guild_config (guild_id, prefixes, stats_enabled)
+                   VALUES ($1, $2, $3)
+                   ON CONFLICT (guild_id)
+                   DO UPDATE SET stats_enabled = $3;""",
+                guild_id,
+                list(settings.prefixes),
+                enabled,
+            )
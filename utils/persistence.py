@@ -0,0 +1,209 @@
+"""
+MIT License
+
+Copyright (c) 2021 - µYert
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import pickle
+import sqlite3
+from asyncio import AbstractEventLoop, TimerHandle, get_event_loop
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import blake2b
+from io import BytesIO
+from logging import getLogger
+from time import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from discord import Embed
+
+log = getLogger(__name__)
+
+
+def _rebuild_embed(cls: type, data: dict) -> Embed:
+    """Unpickles an embed from it's dict form"""
+    return cls.from_dict(data)
+
+
+class _Pickler(pickle.Pickler):
+    """
+    Stores embeds as their dict form, pickling them as is would
+    break the identity of the Embed.Empty sentinel
+    """
+
+    def reducer_override(self, obj: Any) -> Any:
+        if isinstance(obj, Embed):
+            return _rebuild_embed, (type(obj), obj.to_dict())
+        return NotImplemented
+
+
+def dumps(value: Any) -> Optional[bytes]:
+    """Serializes a value, returns None if it can't be"""
+    buffer = BytesIO()
+    try:
+        _Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(value)
+    except (pickle.PicklingError, TypeError, AttributeError, RecursionError):
+        return None
+    return buffer.getvalue()
+
+
+class CacheStore:
+    """
+    An on-disk second tier for the TimedCaches, backed by SQLite
+
+    Writes are buffered and flushed from a background thread,
+    entries are only read back when the memory tier misses,
+    so nothing is loaded at startup
+    """
+
+    def __init__(
+        self, path: str, *, flush_delay: float = 5.0, loop: AbstractEventLoop = None
+    ):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.loop = loop or get_event_loop()
+        # sqlite connections are tied to their thread, so there is only one
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache")
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pending: Dict[str, Tuple[Optional[bytes], float, float]] = {}
+        self._flush_handle: Optional[TimerHandle] = None
+
+    @staticmethod
+    def make_key(region: str, key: Hashable) -> Optional[str]:
+        """Digests a key so it can be stored, None if it can't be serialized"""
+        if (data := dumps((region, key))) is None:
+            return None
+        return blake2b(data, digest_size=20).hexdigest()
+
+    # * Executor side
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = con = sqlite3.connect(self.path)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(
+                """CREATE TABLE IF NOT EXISTS cache (
+                       key TEXT PRIMARY KEY,
+                       value BLOB NOT NULL,
+                       expires REAL NOT NULL,
+                       stale REAL NOT NULL
+                   )"""
+            )
+        return self._connection
+
+    def _read(self, key: str) -> Optional[Tuple[bytes, float, float]]:
+        query = "SELECT value, expires, stale FROM cache WHERE key = ? AND expires > ?"
+        return self._connect().execute(query, (key, time())).fetchone()
+
+    def _write(self, items: List[Tuple[str, Optional[bytes], float, float]]) -> None:
+        con = self._connect()
+        with con:
+            con.executemany(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                [item for item in items if item[1] is not None],
+            )
+            con.executemany(
+                "DELETE FROM cache WHERE key = ?",
+                [(item[0],) for item in items if item[1] is None],
+            )
+            con.execute("DELETE FROM cache WHERE expires <= ?", (time(),))
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    # * Loop side
+
+    def _schedule_flush(self) -> None:
+        if self._flush_handle is None:
+            self._flush_handle = self.loop.call_later(
+                self.flush_delay, lambda: self.loop.create_task(self.flush())
+            )
+
+    def put(
+        self, region: str, key: Hashable, value: Any, expires: float, stale: float
+    ) -> None:
+        """Queues a value to be written, expires and stale are unix timestamps"""
+        if (store_key := self.make_key(region, key)) is None:
+            return
+        if (data := dumps(value)) is None:
+            return  # live objects we can't rebuild, they stay in memory only
+
+        self._pending[store_key] = (data, expires, stale)
+        self._schedule_flush()
+
+    def discard(self, region: str, key: Hashable) -> None:
+        """Queues the deletion of a value"""
+        if (store_key := self.make_key(region, key)) is not None:
+            self._pending[store_key] = (None, 0.0, 0.0)
+            self._schedule_flush()
+
+    async def get(
+        self, region: str, key: Hashable
+    ) -> Optional[Tuple[Any, float, float]]:
+        """Returns the stored value with its expiry and stale timestamps, if any"""
+        if (store_key := self.make_key(region, key)) is None:
+            return None
+
+        if (pending := self._pending.get(store_key)) is not None:
+            data, expires, stale = pending
+        else:
+            try:
+                row = await self.loop.run_in_executor(
+                    self._executor, self._read, store_key
+                )
+            except sqlite3.Error:
+                log.exception("Could not read from the cache store")
+                return None
+            if row is None:
+                return None
+            data, expires, stale = row
+
+        if data is None or expires <= time():
+            return None
+
+        try:
+            return pickle.loads(data), expires, stale
+        except Exception:  # the class might have changed since it was stored
+            log.warning("Dropping an unreadable cache entry %s", store_key)
+            self.discard(region, key)
+            return None
+
+    async def flush(self) -> None:
+        """Writes every pending value to the disk"""
+        self._flush_handle = None
+        if not self._pending:
+            return
+
+        items = [(k, *entry) for k, entry in self._pending.items()]
+        self._pending = {}
+        try:
+            await self.loop.run_in_executor(self._executor, self._write, items)
+        except sqlite3.Error:
+            log.exception("Could not write %s entries to the cache store", len(items))
+
+    async def close(self) -> None:
+        """Flushes the pending writes and closes the database"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        await self.flush()
+        await self.loop.run_in_executor(self._executor, self._close)
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,216 @@
+"""
+MIT License
+
+Copyright (c) 2021 - µYert
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import re
+from bisect import bisect_left
+from collections import deque
+from functools import lru_cache
+from logging import getLogger
+from time import perf_counter
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+slow_log = getLogger("yert.slow_queries")
+
+# 0.1ms, 0.2ms ... ~52s, a query slower than that lands in the last bucket
+BOUNDS = [0.0001 * 2 ** i for i in range(20)]
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_LITERALS = re.compile(r"'(?:[^']|'')*'|(?<![$\w])\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def normalize(query: str) -> str:
+    """Strips the comments, literals and layout so equivalent queries share stats"""
+    query = _COMMENTS.sub(" ", query)
+    query = _LITERALS.sub("?", query)
+    return _SPACES.sub(" ", query).strip().rstrip(";")
+
+
+class Histogram:
+    """Latencies bucketed on a log scale, cheap to record into"""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, elapsed: float) -> None:
+        self.buckets[bisect_left(BOUNDS, elapsed)] += 1
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket the q-th quantile falls in"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, amount in zip(BOUNDS, self.buckets):
+            seen += amount
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class SlowQuery(NamedTuple):
+    query: str
+    elapsed: float
+
+
+class QueryStats:
+    """
+    Per statement latency histograms, keyed by normalized SQL,
+    plus the time spent waiting on the pool for a connection
+
+    Statements slower than slow_threshold seconds are logged
+    on the yert.slow_queries logger and kept in recent_slow
+    """
+
+    def __init__(self, *, slow_threshold: Optional[float] = 0.5):
+        self.slow_threshold = slow_threshold
+        self.statements: Dict[str, Histogram] = {}
+        self.acquire_waits = Histogram()
+        self.recent_slow: Deque[SlowQuery] = deque(maxlen=50)
+
+    def record(self, query: str, elapsed: float) -> None:
+        key = normalize(query)
+        if (histogram := self.statements.get(key)) is None:
+            histogram = self.statements[key] = Histogram()
+        histogram.record(elapsed)
+
+        if self.slow_threshold is not None and elapsed >= self.slow_threshold:
+            self.recent_slow.append(SlowQuery(key, elapsed))
+            slow_log.warning("%.1fms %s", elapsed * 1000, key)
+
+    def timed(self, query: str) -> "_Timer":
+        """Context manager recording how long its body took"""
+        return _Timer(self, query)
+
+    def top(
+        self, amount: int = 10, *, by: str = "total"
+    ) -> List[Tuple[str, Histogram]]:
+        """The statements that cost the most, by total time or by p99"""
+        if by == "p99":
+            key = lambda item: item[1].percentile(0.99)
+        else:
+            key = lambda item: item[1].total
+        return sorted(self.statements.items(), key=key, reverse=True)[:amount]
+
+    def reset(self) -> None:
+        self.statements.clear()
+        self.acquire_waits = Histogram()
+        self.recent_slow.clear()
+
+
+class _Timer:
+    __slots__ = ("stats", "query", "start")
+
+    def __init__(self, stats: QueryStats, query: str):
+        self.stats = stats
+        self.query = query
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, *exc):
+        self.stats.record(self.query, perf_counter() - self.start)
+
+
+class InstrumentedPool:
+    """
+    Wraps an asyncpg pool to time how long acquiring takes,
+    the queries themselves are timed by the connections
+    """
+
+    def __init__(self, pool, stats: QueryStats):
+        self._pool = pool
+        self.stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
+
+    def acquire(self, *, timeout: float = None) -> "_TimedAcquire":
+        return _TimedAcquire(self, timeout)
+
+    async def release(self, connection, *, timeout: float = None) -> None:
+        await self._pool.release(connection, timeout=timeout)
+
+    async def execute(self, query: str, *args, timeout: float = None) -> str:
+        async with self.acquire() as con:
+            return await con.execute(query, *args, timeout=timeout)
+
+    async def executemany(self, command: str, args, *, timeout: float = None):
+        async with self.acquire() as con:
+            return await con.executemany(command, args, timeout=timeout)
+
+    async def fetch(self, query: str, *args, timeout: float = None, **kwargs):
+        async with self.acquire() as con:
+            return await con.fetch(query, *args, timeout=timeout, **kwargs)
+
+    async def fetchrow(self, query: str, *args, timeout: float = None, **kwargs):
+        async with self.acquire() as con:
+            return await con.fetchrow(query, *args, timeout=timeout, **kwargs)
+
+    async def fetchval(self, query: str, *args, column: int = 0, timeout: float = None):
+        async with self.acquire() as con:
+            return await con.fetchval(query, *args, column=column, timeout=timeout)
+
+
+class _TimedAcquire:
+    """Works both as `await pool.acquire()` and `async with pool.acquire()`"""
+
+    __slots__ = ("pool", "timeout", "connection")
+
+    def __init__(self, pool: InstrumentedPool, timeout: Optional[float]):
+        self.pool = pool
+        self.timeout = timeout
+        self.connection = None
+
+    async def _acquire(self):
+        start = perf_counter()
+        try:
+            return await self.pool._pool.acquire(timeout=self.timeout)
+        finally:
+            self.pool.stats.acquire_waits.record(perf_counter() - start)
+
+    def __await__(self):
+        return self._acquire().__await__()
+
+    async def __aenter__(self):
+        self.connection = await self._acquire()
+        return self.connection
+
+    async def __aexit__(self, *exc):
+        connection, self.connection = self.connection, None
+        await self.pool.release(connection)